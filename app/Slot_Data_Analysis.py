@@ -1,6 +1,6 @@
 import datetime
 import streamlit as st
-from data_from_supabase import fetch
+from data_from_supabase import fetch, cache_stats
 
 N_PAST_DAYS = 3
 today = datetime.date.today()
@@ -31,6 +31,13 @@ st.page_link("pages/03_機種別出玉率履歴.py", label="機別種分析", ic
 st.page_link("pages/04_台別出玉率履歴.py", label="台別分析", icon="📈")
 st.page_link("pages/06_末尾日統計.py", label="末尾日分析", icon="📈")
 
+# 日付ごとのキャッシュの効き具合
+stats = cache_stats()
+st.sidebar.caption(
+    f"キャッシュ: {stats['days']} 日分 / {stats['mb']} MB / "
+    f"ヒット率 {stats['hit_rate']:.0%}（{stats['hits']} / {stats['hits'] + stats['misses']}）"
+)
+
 
 # st.header(f"データベースから最新 {N_PAST_DAYS} 日分のデータを表示", divider="rainbow")
 # df = fetch("result_joined", n_d_ago, today, hall=None, model=None)
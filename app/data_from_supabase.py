@@ -1,10 +1,16 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
-from typing import Optional, Union, Any
+from typing import Callable, Optional, Union, Any
+import numpy as np
 import pandas as pd
 from supabase import create_client, Client
 import streamlit as st
 
+import local_store
+from day_cache import day_cache
+from utils_for_streamlit import WEEKDAY_MAP
+
 
 @st.cache_resource
 def get_supabase_client() -> Client:
@@ -44,6 +50,165 @@ def _fetch_all_rows(query, page_size: int = 1000) -> list[dict[str, Any]]:
     return all_rows
 
 
+# --------------------------------------------------
+# 内部共通関数：列ごとに型を決めて DataFrame を作る
+# --------------------------------------------------
+# result_joined の列の型（文字列は category、日付は datetime64、数値は幅の小さい整数）
+RESULT_SCHEMA: dict[str, str] = {
+    "pref": "category",
+    "hall": "category",
+    "model": "category",
+    "date": "datetime64[ns]",
+    "unit_no": "int32",
+    "game": "int32",
+    "bb": "int16",
+    "rb": "int16",
+    "medal": "int32",
+    # result_features（sql/02_result_features.sql）の日付から作る列
+    "day": "int8",
+    "weekday_num": "int8",
+    "day_last": "int8",
+}
+
+
+def _to_column(values: list[Any], dtype: Optional[str]) -> Any:
+    if dtype == "category":
+        return pd.Categorical(values)
+    if dtype == "datetime64[ns]":
+        return pd.to_datetime(values, format="%Y-%m-%d")
+    if dtype is not None and dtype.startswith("int"):
+        if any(v is None for v in values):
+            # 欠損があるときだけ nullable 整数にする
+            return pd.array(values, dtype=dtype.capitalize())
+        return np.asarray(values, dtype=dtype)
+    return values
+
+
+def _to_frame(rows: list[dict[str, Any]], schema: dict[str, str] = RESULT_SCHEMA) -> pd.DataFrame:
+    """
+    行（dict）のリストを列ごとの配列に組み替え、schema の型で DataFrame を作る。
+    pd.DataFrame(rows) だと文字列が object、数値が int64 になりメモリを多く使う。
+    """
+    if not rows:
+        return pd.DataFrame()
+    columns = list(rows[0])
+    return pd.DataFrame(
+        {c: _to_column([r[c] for r in rows], schema.get(c)) for c in columns},
+        columns=columns,
+    )
+
+
+def frame_memory(df: pd.DataFrame) -> int:
+    """DataFrame の使用メモリ（文字列の中身も含むバイト数）"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+# --------------------------------------------------
+# 内部共通関数：キーセット（シーク）方式のページング
+# --------------------------------------------------
+# result_joined の1行を一意に決める列（この順で並べてページングする）
+# ホールは (name, prefecture_id) で一意なので、同名のホールを区別するために pref も含める
+KEYSET_COLUMNS: tuple[str, ...] = ("date", "hall", "pref", "model", "unit_no")
+
+
+def _quote(value: Any) -> str:
+    """PostgREST の or フィルタ用に値をダブルクォートで囲む（, . ( ) を含む名前対策）"""
+    text = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{text}"'
+
+
+def _keyset_filter(keys: tuple[str, ...], last: dict[str, Any]) -> str:
+    """
+    (k1, k2, ...) > (v1, v2, ...) を PostgREST の or 条件に展開する。
+    例: date.gt.v1, and(date.eq.v1,hall.gt.v2), and(date.eq.v1,hall.eq.v2,model.gt.v3), ...
+    """
+    conds = []
+    for i, key in enumerate(keys):
+        eqs = [f"{k}.eq.{_quote(last[k])}" for k in keys[:i]]
+        gt = f"{key}.gt.{_quote(last[key])}"
+        conds.append(f"and({','.join([*eqs, gt])})" if eqs else gt)
+    return ",".join(conds)
+
+
+def _fetch_all_rows_keyset(
+    make_query: Callable[[], Any],
+    keys: tuple[str, ...] = KEYSET_COLUMNS,
+    page_size: int = 1000,
+) -> list[dict[str, Any]]:
+    """
+    keys の順に並べ、前ページ最後の行より後ろだけを limit 件ずつ取得する。
+    OFFSET と違い、後ろのページでも読み飛ばしが発生しないため1ページの時間が一定。
+    クエリビルダーはメソッド呼び出しで自身を書き換えるため、ページごとに make_query() で作り直す。
+    """
+    all_rows: list[dict[str, Any]] = []
+    last: Optional[dict[str, Any]] = None
+
+    while True:
+        query = make_query()
+        for key in keys:
+            query = query.order(key)
+        if last is not None:
+            query = query.or_(_keyset_filter(keys, last))
+        rows = query.limit(page_size).execute().data
+        all_rows.extend(rows)
+        if len(rows) < page_size:
+            break
+        last = rows[-1]
+
+    return all_rows
+
+
+# --------------------------------------------------
+# 内部共通関数：日付ごとに分けて並列に取得
+# --------------------------------------------------
+# 日付シャードを同時に取得する数（1 のときは期間まとめて順番に取得）
+FETCH_WORKERS = int(os.environ.get("FETCH_WORKERS", "4"))
+
+
+def _fetch_by_day(
+    make_query: Callable[[str, str], Any],
+    start: Union[str, date],
+    end: Union[str, date],
+    keys: tuple[str, ...] = KEYSET_COLUMNS,
+    workers: int = FETCH_WORKERS,
+) -> list[dict[str, Any]]:
+    """
+    [start, end] を1日ずつに分け、make_query(day, day) を workers 本のスレッドで並列に取得する。
+    キーの先頭が date なので、日付順につなげれば期間まとめて取得したときと同じ並びになる。
+    """
+    days = pd.date_range(start, end).strftime("%Y-%m-%d").tolist()
+    if workers <= 1 or len(days) <= 1 or keys[0] != "date":
+        return _fetch_all_rows_keyset(lambda: make_query(start, end), keys)
+
+    parts = _fetch_days(make_query, days, keys, workers)
+    return [row for day in days for row in parts[day]]
+
+
+def _fetch_days(
+    make_query: Callable[[str, str], Any],
+    days: list[str],
+    keys: tuple[str, ...] = KEYSET_COLUMNS,
+    workers: int = FETCH_WORKERS,
+) -> dict[str, list[dict[str, Any]]]:
+    """指定した日付（連続していなくてよい）を1日ずつ並列に取得する"""
+
+    def fetch_day(day: str) -> list[dict[str, Any]]:
+        return _fetch_all_rows_keyset(lambda: make_query(day, day), keys)
+
+    # map は渡した順（日付順）に結果を返す
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return dict(zip(days, pool.map(fetch_day, days)))
+
+
+def _select_columns(
+    columns: Optional[tuple[str, ...]], keys: tuple[str, ...] = KEYSET_COLUMNS
+) -> str:
+    """select に渡す列（ページングに使うキー列は必ず含める）。None のときは全列"""
+    if columns is None:
+        return "*"
+    return ",".join(dict.fromkeys([*columns, *keys]))
+
+
 # def fetch(view: str, start: str, end: str, hall: str = None, model: str = None):
 #     """
 #     Supabase からデータをページングしてすべて取得する。
@@ -87,60 +252,229 @@ def _fetch_all_rows(query, page_size: int = 1000) -> list[dict[str, Any]]:
 # --------------------------------------------------
 # ① 期間指定＆hall/model でフィルタ（既存 fetch の改良版）
 # --------------------------------------------------
-@st.cache_data
 def fetch(
     view: str,
     start: Union[str, date],
     end: Union[str, date],
     hall: Optional[str] = None,
     model: Optional[str] = None,
+    columns: Optional[tuple[str, ...]] = None,
 ) -> pd.DataFrame:
     """
     Supabase から date 範囲でデータ取得。
     hall, model を指定しない場合はすべてを取得。
-    内部でページングして 1000件制限を回避する。
+    columns を指定するとその列（＋ページング用のキー列）だけを取得する。
+    キャッシュのキーに含まれるよう、リストではなくタプルで渡す。
+    内部でページングして 1000件制限を回避する（複数日は日付ごとに並列取得）。
+    hall / model の指定がなければ、日付ごとのキャッシュ（メモリ → ローカルの Parquet）から読み、
+    足りない日だけを Supabase から取得する。
     """
+    if hall is not None or model is not None:
+        return _fetch_filtered(view, start, end, make_filters(hall=hall, model=model), columns)
+
+    def fetch_days(days, cols):
+        parts = _fetch_days(_make_query(view, _select_columns(cols)), days)
+        return {day: _to_frame(rows) for day, rows in parts.items() if rows}
+
+    want = None if columns is None else tuple(dict.fromkeys([*columns, *KEYSET_COLUMNS]))
+    return local_store.read_range(view, start, end, want, fetch_days)
+
+
+def _make_query(
+    view: str, select: str, filters: tuple[tuple[str, Any], ...] = ()
+) -> Callable[[str, str], Any]:
+    """date 範囲と filters（make_filters の結果）で絞るクエリを作る関数を返す"""
     supabase = get_supabase_client()
-    query = supabase.table(view).select(
-        "*").gte("date", start).lte("date", end)
-    if hall is not None:
-        query = query.eq("hall", hall)
-    if model is not None:
-        query = query.eq("model", model)
-    rows = _fetch_all_rows(query)
-    df = pd.DataFrame(rows)
 
-    return df
+    def make_query(day_start, day_end):
+        query = supabase.table(view).select(
+            select).gte("date", day_start).lte("date", day_end)
+        return _apply_filters(query, filters)
+
+    return make_query
+
+
+@st.cache_data
+def _fetch_filtered(
+    view: str,
+    start: Union[str, date],
+    end: Union[str, date],
+    filters: tuple[tuple[str, Any], ...],
+    columns: Optional[tuple[str, ...]],
+) -> pd.DataFrame:
+    """
+    絞り込みありの取得（日付ごとのキャッシュは使わず、引数ごとにキャッシュする）。
+    曜日・日・末尾日の絞り込みがあれば、当てはまる日付だけを取得する
+    """
+    make_query = _make_query(view, _select_columns(columns), filters)
+    date_filters = tuple((c, v) for c, v in filters if c in DATE_PART_COLUMNS)
+    if not date_filters:
+        return _to_frame(_fetch_by_day(make_query, start, end))
+    dates = pd.date_range(start, end)
+    dates = dates[_filter_mask(_date_parts(dates), date_filters)]
+    days = dates.strftime("%Y-%m-%d").tolist()
+    parts = _fetch_days(make_query, days)
+    return _to_frame([row for day in days for row in parts[day]])
+
+
+# --------------------------------------------------
+# ページの絞り込み条件 → PostgREST のフィルタ（sql/02_result_features.sql）
+# --------------------------------------------------
+# day / weekday_num / day_last を列として持つビュー
+FEATURES_VIEW = "result_features"
+# 日付から作る列（result_joined にはなく、FEATURES_VIEW にだけある）
+DATE_PART_COLUMNS = ("day", "weekday_num", "day_last")
+FILTER_COLUMNS = ("hall", "model", "unit_no", *DATE_PART_COLUMNS)
+
+
+def make_filters(
+    hall: Optional[str] = None,
+    model: Optional[str] = None,
+    unit_no: Optional[int] = None,
+    weekday: Optional[str] = None,
+    day: Optional[int] = None,
+    day_last: Optional[int] = None,
+) -> tuple[tuple[str, Any], ...]:
+    """
+    ページの選択を (列, 値) のタプルにする（None は絞り込まない）。
+    キャッシュのキーに含まれるようタプルで返す。weekday は "月"〜"日" で渡す
+    """
+    weekday_num = None
+    if weekday is not None:
+        weekday_num = {label: num for num, label in WEEKDAY_MAP.items()}[weekday]
+    values = {
+        "hall": hall,
+        "model": model,
+        "unit_no": unit_no,
+        "weekday_num": weekday_num,
+        "day": day,
+        "day_last": day_last,
+    }
+    return tuple((column, value) for column, value in values.items() if value is not None)
+
+
+def _apply_filters(query, filters: tuple[tuple[str, Any], ...]):
+    for column, value in filters:
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"絞り込みに使えない列です: {column}")
+        query = query.eq(column, value)
+    return query
+
+
+def _date_parts(dates: pd.DatetimeIndex) -> dict[str, np.ndarray]:
+    """FEATURES_VIEW の day / weekday_num / day_last と同じ値"""
+    day = np.asarray(dates.day)
+    return {"day": day, "weekday_num": np.asarray(dates.weekday), "day_last": day % 10}
+
+
+def _filter_mask(columns: dict[str, Any], filters: tuple[tuple[str, Any], ...]) -> np.ndarray:
+    mask = np.ones(len(next(iter(columns.values()))), dtype=bool)
+    for column, value in filters:
+        mask &= np.asarray(columns[column] == value)
+    return mask
+
+
+def _filter_frame(df: pd.DataFrame, filters: tuple[tuple[str, Any], ...]) -> pd.DataFrame:
+    """_apply_filters と同じ絞り込みを手元の DataFrame に対して行う"""
+    if df.empty or not filters:
+        return df
+    columns = {**{c: df[c] for c in df.columns}, **_date_parts(pd.DatetimeIndex(df["date"]))}
+    return df[_filter_mask(columns, filters)].reset_index(drop=True)
+
+
+def fetch_where(
+    start: Union[str, date],
+    end: Union[str, date],
+    filters: tuple[tuple[str, Any], ...],
+    columns: Optional[tuple[str, ...]] = None,
+) -> pd.DataFrame:
+    """
+    filters（make_filters の結果）に合う行だけを返す。
+    期間の全日が日付ごとのキャッシュ（メモリ → ローカルの Parquet）にあれば、それを手元で絞り込む。
+    なければ絞り込みを FEATURES_VIEW へのクエリに含めて、合う行だけを Supabase から取得する
+    （日付ごとのキャッシュは絞り込み前の全行を持つため、絞り込んだ結果はそこには保存しない）。
+    columns には DATE_PART_COLUMNS は含めず、必要なら features.add_features で付ける。
+    """
+    if not filters:
+        return fetch("result_joined", start, end, columns=columns)
+    want = None
+    if columns is not None:
+        base = [c for c, _ in filters if c not in DATE_PART_COLUMNS]
+        want = tuple(dict.fromkeys([*columns, *KEYSET_COLUMNS, *base]))
+    held = local_store.read_cached("result_joined", start, end, want)
+    if held is not None:
+        df = _filter_frame(held, filters)
+        return df if columns is None else df[list(dict.fromkeys([*columns, *KEYSET_COLUMNS]))]
+    return _fetch_filtered(FEATURES_VIEW, start, end, filters, columns)
+
+
+@st.cache_data(ttl=600)
+def fetch_result_units(start: Union[str, date], end: Union[str, date]) -> pd.DataFrame:
+    """
+    期間内にデータのある ホール × 機種 × 台番号 と日数（sql/02_result_features.sql の result_units）。
+    行そのものを取得せずに、セレクトボックスの選択肢を作るのに使う
+    """
+    df = _fetch_rpc("result_units", start, end, keys=("hall", "model", "unit_no"))
+    if df.empty:
+        return pd.DataFrame(columns=["hall", "model", "unit_no", "day_count"])
+    return df.astype({"hall": "category", "model": "category", "unit_no": "int32"})
+
+
+def cache_stats() -> dict[str, float]:
+    """日付ごとのキャッシュ（day_cache）の保持日数・サイズ・ヒット/ミス数"""
+    return day_cache.stats()
 
 
 # --------------------------------------------------
 # ② 1日分だけ取得するヘルパー
 # --------------------------------------------------
-@st.cache_data
 def fetch_one_day(
-    view: str, target_date: str, hall: Optional[str] = None, model: Optional[str] = None
+    view: str,
+    target_date: str,
+    hall: Optional[str] = None,
+    model: Optional[str] = None,
+    columns: Optional[tuple[str, ...]] = None,
 ) -> pd.DataFrame:
     """
     指定した1日分（target_date）のデータを取得する。
-    内部的には fetch() を start=end にして呼び出すだけ。
+    内部的には fetch() を start=end にして呼び出すだけ（期間取得と同じ日付ごとのキャッシュを使う）。
     """
-    return fetch(view=view, start=target_date, end=target_date, hall=hall, model=model)
+    return fetch(
+        view=view, start=target_date, end=target_date, hall=hall, model=model, columns=columns
+    )
 
 
 # --------------------------------------------------
 # ③ 最新日（最大 date）のデータを取得するヘルパー
 # --------------------------------------------------
-@st.cache_data
 def fetch_latest(
-    view: str, hall: Optional[str] = None, model: Optional[str] = None
+    view: str,
+    hall: Optional[str] = None,
+    model: Optional[str] = None,
+    columns: Optional[tuple[str, ...]] = None,
 ) -> pd.DataFrame:
     """
     指定 view について、date が最大の日付のデータを取得する。
     hall / model を指定した場合は、その条件内での最新日を対象とする。
     """
-    supabase = get_supabase_client()
+    latest_date = _fetch_latest_date(view, hall, model)
+
+    if latest_date is None:
+        # データなしの場合は空の DataFrame を返す
+        return pd.DataFrame()
+
+    # その最新日について1日分を取得
+    return fetch_one_day(
+        view=view, target_date=latest_date, hall=hall, model=model, columns=columns
+    )
+
 
-    # まず最新日だけを1行取得
+@st.cache_data(ttl=600)
+def _fetch_latest_date(
+    view: str, hall: Optional[str] = None, model: Optional[str] = None
+) -> Optional[str]:
+    """最新日だけを1行取得（1日1回の更新なので10分キャッシュする）"""
+    supabase = get_supabase_client()
     query = supabase.table(view).select(
         "date").order("date", desc=True).limit(1)
 
@@ -149,16 +483,64 @@ def fetch_latest(
     if model is not None:
         query = query.eq("model", model)
 
-    res = query.execute()
-    rows = res.data
+    rows = query.execute().data
+    return rows[0]["date"] if rows else None
 
-    if not rows:
-        # データなしの場合は空の DataFrame を返す
-        return pd.DataFrame()
 
-    latest_date = rows[0]["date"]
-    # その最新日について1日分を取得
-    return fetch_one_day(view=view, target_date=latest_date, hall=hall, model=model)
+# --------------------------------------------------
+# 集計関数（sql/01_aggregate_functions.sql）の呼び出し
+# --------------------------------------------------
+def _fetch_rpc(
+    fn: str,
+    start: Union[str, date],
+    end: Union[str, date],
+    keys: tuple[str, ...],
+    params: Optional[dict[str, Any]] = None,
+) -> pd.DataFrame:
+    """集計関数を日付ごと（date を返す関数）または期間まとめて呼び出し、ページングして全件取得する"""
+    supabase = get_supabase_client()
+
+    def make_query(day_start, day_end):
+        return supabase.rpc(fn, {"p_start": str(day_start), "p_end": str(day_end), **(params or {})})
+
+    if keys[0] == "date":
+        rows = _fetch_by_day(make_query, start, end, keys)
+    else:
+        rows = _fetch_all_rows_keyset(lambda: make_query(start, end), keys)
+    return pd.DataFrame(rows)
+
+
+@st.cache_data
+def fetch_hall_date_stats(start: Union[str, date], end: Union[str, date]) -> pd.DataFrame:
+    """ホール × 日付ごとの台数・回転数合計・メダル合計"""
+    return _fetch_rpc("hall_date_stats", start, end, keys=("date", "hall"))
+
+
+@st.cache_data
+def fetch_hall_model_date_stats(
+    start: Union[str, date], end: Union[str, date]
+) -> pd.DataFrame:
+    """ホール × 機種 × 日付ごとの台数・回転数合計・メダル合計"""
+    return _fetch_rpc("hall_model_date_stats", start, end, keys=("date", "hall", "model"))
+
+
+# --------------------------------------------------
+# 設置中の台（sql/03_current_units.sql）
+# --------------------------------------------------
+@st.cache_data(ttl=600)
+def fetch_current_units() -> pd.DataFrame:
+    """
+    現在設置されている ホール × 機種 × 台番号（スクレイパーがアップロード後に更新する）。
+    台ごとに1行だけなので、直近の行データを取得して作るより小さい
+    """
+    supabase = get_supabase_client()
+    keys = ("hall", "model", "unit_no")
+    rows = _fetch_all_rows_keyset(
+        lambda: supabase.table("current_units").select(",".join(keys)), keys
+    )
+    if not rows:
+        return pd.DataFrame(columns=list(keys))
+    return _to_frame(rows)
 
 
 # --------------------------------------------------
@@ -206,6 +588,8 @@ def fetch_paginated(
     lte_filters: Optional[dict[str, any]] = None,
     order_by: Optional[str] = None,
     desc: bool = False,
+    keys: Optional[tuple[str, ...]] = None,
+    columns: Optional[tuple[str, ...]] = None,
 ) -> pd.DataFrame:
     """
     任意のテーブル(view)に対して、eq/gte/lte 条件を dict で渡して
@@ -219,27 +603,50 @@ def fetch_paginated(
             order_by="date",
             desc=False,
         )
+    keys は行を一意に決める列（キーセット方式のページングに使う）。
+    省略時は result_joined なら KEYSET_COLUMNS を使い、それ以外の view では
+    キーが分からないため order_by で並べた range（OFFSET）方式でページングする。
+    columns を指定するとその列（＋ keys）だけを取得する。
     """
     supabase = get_supabase_client()
-    query = supabase.table(view).select("*")
-    # eq 条件
-    if eq_filters:
-        for col, val in eq_filters.items():
-            query = query.eq(col, val)
-    # gte 条件
-    if gte_filters:
-        for col, val in gte_filters.items():
+
+    gte_filters = dict(gte_filters or {})
+    lte_filters = dict(lte_filters or {})
+
+    if keys is None and view == "result_joined":
+        keys = KEYSET_COLUMNS
+    select = _select_columns(columns, keys or ())
+
+    def make_query(day_start=None, day_end=None):
+        query = supabase.table(view).select(select)
+        # eq 条件
+        if eq_filters:
+            for col, val in eq_filters.items():
+                query = query.eq(col, val)
+        # gte 条件（日付ごとに分けるときは date を差し替える）
+        for col, val in {**gte_filters, **({"date": day_start} if day_start else {})}.items():
             query = query.gte(col, val)
-    # lte 条件
-    if lte_filters:
-        for col, val in lte_filters.items():
+        # lte 条件
+        for col, val in {**lte_filters, **({"date": day_end} if day_end else {})}.items():
             query = query.lte(col, val)
-    # order by
-    if order_by:
-        query = query.order(order_by, desc=desc)
-    rows = _fetch_all_rows(query)
+        return query
+
+    if keys is None:
+        query = make_query()
+        if order_by:
+            query = query.order(order_by, desc=desc)
+        return _to_frame(_fetch_all_rows(query))
+
+    if "date" in gte_filters and "date" in lte_filters:
+        rows = _fetch_by_day(make_query, gte_filters["date"], lte_filters["date"], keys)
+    else:
+        rows = _fetch_all_rows_keyset(make_query, keys)
+    df = _to_frame(rows)
+    # ページングはキー順で行うため、order by は取得後に並べ替える
+    if order_by and not df.empty:
+        df = df.sort_values(order_by, ascending=not desc, kind="stable", ignore_index=True)
 
-    return pd.DataFrame(rows)
+    return df
 
 
 if __name__ == "__main__":
@@ -263,3 +670,4 @@ if __name__ == "__main__":
     df_one_day = fetch_one_day(view, "2025-11-13", hall=None, model=None)
     print(df_one_day.date.unique())
     print(df_one_day.shape[0])
+    print(cache_stats())
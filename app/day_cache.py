@@ -0,0 +1,106 @@
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+import pandas as pd
+
+
+# --------------------------------------------------
+# 設定
+# --------------------------------------------------
+# 日付ごとの DataFrame をプロセス内に保持する上限（MB）
+DAY_CACHE_MB = int(os.environ.get("DAY_CACHE_MB", "256"))
+
+
+@dataclass
+class _Entry:
+    df: pd.DataFrame
+    fetched_at: datetime
+    nbytes: int
+    complete: bool  # 全列を持っているか
+
+
+class DayCache:
+    """
+    (view, date) ごとの DataFrame を保持する LRU キャッシュ。
+    合計サイズが budget_bytes を超えたら、最も長く使われていない日から捨てる。
+    Streamlit の全セッションで共有するため、操作はロックで守る。
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(
+        self,
+        view: str,
+        day: str,
+        columns: Optional[tuple[str, ...]],
+        is_fresh: Callable[[str, datetime], bool],
+    ) -> Optional[pd.DataFrame]:
+        """保持していて新しく、必要な列がそろっていればその日の DataFrame を返す"""
+        key = (view, day)
+        with self._lock:
+            entry = self._entries.get(key)
+            usable = (
+                entry is not None
+                and is_fresh(day, entry.fetched_at)
+                and (
+                    entry.complete
+                    or entry.df.empty
+                    or (columns is not None and set(columns) <= set(entry.df.columns))
+                )
+            )
+            if not usable:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.df
+
+    def columns(self, view: str, day: str) -> list[str]:
+        """保持している列（なければ空）"""
+        with self._lock:
+            entry = self._entries.get((view, day))
+            return list(entry.df.columns) if entry is not None else []
+
+    def put(
+        self, view: str, day: str, df: pd.DataFrame, fetched_at: datetime, complete: bool
+    ) -> None:
+        nbytes = int(df.memory_usage(deep=True).sum())
+        key = (view, day)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            if nbytes > self.budget_bytes:
+                return
+            self._entries[key] = _Entry(df, fetched_at, nbytes, complete)
+            self.nbytes += nbytes
+            while self.nbytes > self.budget_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+                self.evictions += 1
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "days": len(self._entries),
+                "mb": round(self.nbytes / 1024**2, 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+day_cache = DayCache(DAY_CACHE_MB * 1024**2)
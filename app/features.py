@@ -0,0 +1,241 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_from_supabase import (
+    fetch,
+    fetch_current_units,
+    fetch_hall_date_stats,
+    fetch_hall_model_date_stats,
+)
+from utils_for_streamlit import WEEKDAY_MAP
+
+# 日付ごとのキャッシュの未確定日（昨日など）の取り直しに合わせて作り直す秒数
+FEATURES_TTL_SECONDS = 600
+
+# 取得元（features() の source に渡す名前）
+_SOURCES = {
+    "result_joined": lambda start, end, columns: fetch(
+        "result_joined", start, end, columns=columns
+    ),
+    "hall_date_stats": lambda start, end, columns: fetch_hall_date_stats(start, end),
+    "hall_model_date_stats": lambda start, end, columns: fetch_hall_model_date_stats(start, end),
+}
+
+
+# --------------------------------------------------
+# 派生列の追加
+# --------------------------------------------------
+def add_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    各ページで使う列をまとめて追加する（元の df は変更しない）
+      date_label: "%m-%d %a"（ピボットの列見出し）
+      day / weekday_num / day_last（日の1の位）: int8, weekday: 月〜日（category）
+      BB_rate / RB_rate / Total_rate / medal_rate: game / bb / rb / medal がある場合のみ
+    """
+    if "date" not in df.columns:
+        return df
+    out = df.copy(deep=False)
+    dates = pd.to_datetime(out["date"])
+    out["date"] = dates
+
+    day = dates.dt.day.astype("int8")
+    weekday_num = dates.dt.weekday.astype("int8")
+    out["day"] = day
+    out["weekday_num"] = weekday_num
+    out["weekday"] = pd.Categorical.from_codes(
+        weekday_num.to_numpy(), categories=[WEEKDAY_MAP[i] for i in range(7)]
+    )
+    out["day_last"] = (day % 10).astype("int8")
+    # 日付の種類は少ないので、ユニークな日付だけ文字列にして割り当てる
+    # （ピボットの列見出しになるため category にはしない）
+    uniques = dates.drop_duplicates()
+    labels = pd.Series(uniques.dt.strftime("%m-%d %a").to_numpy(), index=uniques.to_numpy())
+    out["date_label"] = dates.map(labels)
+
+    if {"game", "bb", "rb"} <= set(out.columns):
+        game = out["game"].to_numpy(dtype="float64")
+        bb = out["bb"].to_numpy(dtype="float64")
+        rb = out["rb"].to_numpy(dtype="float64")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["BB_rate"] = np.round(game / bb, 1)
+            out["RB_rate"] = np.round(game / rb, 1)
+            out["Total_rate"] = np.round(game / (bb + rb), 1)
+    if {"game", "medal"} <= set(out.columns):
+        game = out["game"].to_numpy(dtype="float64")
+        medal = out["medal"].to_numpy(dtype="float64")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["medal_rate"] = np.round((game * 3 + medal) / (game * 3), 3)
+    return out
+
+
+# --------------------------------------------------
+# 取得 + 派生列（キャッシュ）
+# --------------------------------------------------
+@st.cache_resource(ttl=FEATURES_TTL_SECONDS, max_entries=16)
+def _load_features(
+    source: str,
+    start: Union[str, date],
+    end: Union[str, date],
+    columns: Optional[tuple[str, ...]],
+) -> pd.DataFrame:
+    return add_features(_SOURCES[source](start, end, columns))
+
+
+def features(
+    source: str,
+    start: Union[str, date],
+    end: Union[str, date],
+    columns: Optional[tuple[str, ...]] = None,
+) -> pd.DataFrame:
+    """
+    source のデータに派生列を付けたものを返す。
+    計算は (source, 期間, 列) ごとに1回だけで、全セッションで同じものを共有する。
+    返すのは浅いコピーなので、ページ側で列を追加しても共有元は変わらない
+    （値の書き換えはせず、絞り込んだ結果に対して行うこと）。
+    """
+    return _load_features(source, start, end, columns).copy(deep=False)
+
+
+# --------------------------------------------------
+# ホール → 機種 → 台番号 の絞り込み（01_データベース検索）
+# --------------------------------------------------
+UNIT_KEYS = ["hall", "model", "unit_no"]
+
+
+@dataclass
+class UnitIndex:
+    """
+    (hall, model, unit_no, date) で並べ替えた MultiIndex の DataFrame と、選択肢用の件数。
+    並べ替え済みなので、選択した範囲は二分探索で位置を求めて切り出すだけで済む
+    """
+
+    df: pd.DataFrame
+    model_sizes: pd.Series  # (hall, model) ごとの行数
+
+    def halls(self) -> list:
+        return sorted(self.model_sizes.index.get_level_values("hall").unique())
+
+    def models(self, hall) -> list:
+        """ホールにある機種（行数の多い順）"""
+        if hall not in self.model_sizes.index.get_level_values("hall"):
+            return []
+        sizes = self.model_sizes.xs(hall, level="hall")
+        return sizes.sort_values(ascending=False, kind="stable").index.tolist()
+
+    def select(self, hall, model=None, unit_no=None) -> pd.DataFrame:
+        """
+        hall（と model, unit_no）の範囲を切り出す（None はすべて）。
+        先頭からの一致は並べ替え済みの索引の位置（slice）で切り出す
+        """
+        key = tuple(k for k in (hall, model) if k is not None)
+        if model is not None and unit_no is not None:
+            key += (unit_no,)
+        try:
+            df = self.df.iloc[self.df.index.get_loc(key)]
+        except KeyError:
+            return self.df.iloc[:0]
+        if model is None and unit_no is not None:
+            # 機種をまたぐ台番号はホールの範囲の中だけで絞り込む
+            df = df[df.index.get_level_values("unit_no") == unit_no]
+        return df
+
+
+def build_unit_index(df: pd.DataFrame) -> UnitIndex:
+    indexed = df.set_index(UNIT_KEYS + ["date"]).sort_index()
+    model_sizes = indexed.groupby(level=["hall", "model"], observed=True).size()
+    return UnitIndex(indexed, model_sizes)
+
+
+@st.cache_resource(ttl=FEATURES_TTL_SECONDS, max_entries=8)
+def unit_index(
+    start: Union[str, date],
+    end: Union[str, date],
+    columns: Optional[tuple[str, ...]] = None,
+) -> UnitIndex:
+    """
+    期間ごとに build_unit_index の結果をキャッシュして返す。
+    全セッションで共有するため、df は書き換えずに select() の結果を使うこと
+    """
+    return build_unit_index(_SOURCES["result_joined"](start, end, columns))
+
+
+# --------------------------------------------------
+# 末尾日統計（06_末尾日統計）
+# --------------------------------------------------
+CUBE_KEYS = ["hall", "model", "unit_no", "day_last"]
+
+
+def build_day_last_cube(df: pd.DataFrame, is_win: float = 1.03) -> pd.DataFrame:
+    """
+    ホール × 機種 × 台番号 × 末尾日 の統計を1回の groupby（名前付き集計）で作る。
+    比率は集計後の合計から計算する。勝ち = medal_rate が is_win を超えた日
+    """
+    df = df.assign(is_win=df["medal_rate"] > is_win)
+    cube = df.groupby(CUBE_KEYS, observed=True, sort=True).agg(
+        game=("game", "sum"),
+        game_m=("game", "mean"),
+        count=("game", "count"),
+        bb=("bb", "sum"),
+        rb=("rb", "sum"),
+        rb_m=("rb", "mean"),
+        rb_std=("rb", "std"),
+        medal=("medal", "sum"),
+        medals_m=("medal", "mean"),
+        wins=("is_win", "sum"),
+    )
+    game = cube["game"].to_numpy(dtype="float64")
+    medal = cube["medal"].to_numpy(dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cube["bb_rate"] = np.round(game / cube["bb"].to_numpy(dtype="float64"), 1)
+        cube["rb_rate"] = np.round(game / cube["rb"].to_numpy(dtype="float64"), 1)
+        cube["cv"] = (cube["rb_std"] / cube["rb_m"]).round(3)
+        cube["medal_rate"] = np.round((game * 3 + medal) / (game * 3), 3)
+    cube["game_m"] = cube["game_m"].round(1)
+    cube["medals_m"] = cube["medals_m"].round(1)
+    cube["win_rate"] = (cube["wins"] / cube["count"]).round(2)
+    return cube.drop(columns=["rb_m", "rb_std", "wins"]).reset_index()
+
+
+@st.cache_resource(ttl=FEATURES_TTL_SECONDS, max_entries=8)
+def _load_day_last_cube(
+    start: Union[str, date],
+    end: Union[str, date],
+    columns: Optional[tuple[str, ...]],
+    is_win: float,
+) -> pd.DataFrame:
+    return build_day_last_cube(_load_features("result_joined", start, end, columns), is_win)
+
+
+@st.cache_resource(ttl=FEATURES_TTL_SECONDS, max_entries=8)
+def _load_current_day_last_cube(
+    start: Union[str, date],
+    end: Union[str, date],
+    columns: Optional[tuple[str, ...]],
+    is_win: float,
+) -> pd.DataFrame:
+    """設置中の台（current_units）だけに絞る（台のキーでの semi-join）"""
+    cube = _load_day_last_cube(start, end, columns, is_win)
+    current = pd.MultiIndex.from_frame(fetch_current_units()[UNIT_KEYS])
+    keys = pd.MultiIndex.from_frame(cube[UNIT_KEYS])
+    return cube[keys.isin(current)].reset_index(drop=True)
+
+
+def day_last_cube(
+    start: Union[str, date],
+    end: Union[str, date],
+    columns: Optional[tuple[str, ...]] = None,
+    is_win: float = 1.03,
+    current_only: bool = False,
+) -> pd.DataFrame:
+    """
+    build_day_last_cube の結果を期間ごとにキャッシュして返す（浅いコピー）。
+    スライダーやホール・末尾日の選択は、この表に対する絞り込みだけで済む。
+    current_only=True なら設置中の台だけに絞ったもの（これも期間ごとにキャッシュ）
+    """
+    load = _load_current_day_last_cube if current_only else _load_day_last_cube
+    return load(start, end, columns, is_win).copy(deep=False)
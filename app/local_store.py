@@ -0,0 +1,205 @@
+import os
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from day_cache import day_cache
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow がなければディスクには保存しない（メモリ上の day_cache だけ使う）
+    pa = None
+
+
+# --------------------------------------------------
+# 設定
+# --------------------------------------------------
+# 日付ごとの Parquet の保存先（LOCAL_STORE=0 で無効。メモリ上の day_cache は常に使う）
+LOCAL_STORE_DIR = Path(
+    os.environ.get("LOCAL_STORE_DIR", Path(__file__).resolve().parent / ".cache" / "store")
+)
+LOCAL_STORE_ENABLED = os.environ.get("LOCAL_STORE", "1") == "1"
+# 取得時点で何日以上前の日付なら確定（以後は取り直さない）とみなすか
+FINAL_AFTER_DAYS = int(os.environ.get("LOCAL_STORE_FINAL_AFTER_DAYS", "2"))
+# 未確定の日付（昨日など）を取り直すまでの分数
+NOT_FINAL_TTL_MINUTES = int(os.environ.get("LOCAL_STORE_NOT_FINAL_TTL_MINUTES", "30"))
+
+# 保存形式を変えたら上げる（古い形式のファイルは読まずに取り直す）
+STORE_VERSION = "2"
+
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return LOCAL_STORE_ENABLED and pa is not None
+
+
+# --------------------------------------------------
+# 1日分の読み書き
+# --------------------------------------------------
+def _path(view: str, day: str) -> Path:
+    return LOCAL_STORE_DIR / view / f"date={day}.parquet"
+
+
+def is_fresh(day: str, fetched_at: datetime) -> bool:
+    """確定済みの日付か、未確定でも取得から NOT_FINAL_TTL_MINUTES 以内なら使える"""
+    if (fetched_at.date() - date.fromisoformat(day)).days >= FINAL_AFTER_DAYS:
+        return True
+    return datetime.now() - fetched_at < timedelta(minutes=NOT_FINAL_TTL_MINUTES)
+
+
+def read_day(view: str, day: str) -> Optional[tuple[pd.DataFrame, datetime, bool]]:
+    """
+    保存済みの1日分を (DataFrame, 取得日時, 全列を持っているか) で返す。
+    ない・古い（未確定で TTL 切れ）場合は None
+    """
+    path = _path(view, day)
+    if not path.exists():
+        return None
+    schema = pq.read_schema(path)
+    meta = schema.metadata or {}
+    if meta.get(b"version") != STORE_VERSION.encode():
+        return None
+    fetched_at = datetime.fromisoformat(meta[b"fetched_at"].decode())
+    if not is_fresh(day, fetched_at):
+        return None
+    df = pq.read_table(path).to_pandas() if schema.names else pd.DataFrame()
+    return df, fetched_at, meta.get(b"all_columns") == b"1"
+
+
+def write_day(view: str, day: str, df: pd.DataFrame, all_columns: bool) -> None:
+    """1日分を保存する（書き込み途中のファイルを読まないよう一時ファイル経由で置き換える）"""
+    path = _path(view, day)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata(
+        {
+            "version": STORE_VERSION,
+            "fetched_at": datetime.now().isoformat(timespec="seconds"),
+            "all_columns": "1" if all_columns else "0",
+        }
+    )
+    tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def stored_columns(view: str, day: str) -> list[str]:
+    path = _path(view, day)
+    return pq.read_schema(path).names if path.exists() else []
+
+
+# --------------------------------------------------
+# 期間の読み込み（足りない日だけ取得）
+# --------------------------------------------------
+def _has_columns(df: pd.DataFrame, complete: bool, columns: Optional[tuple[str, ...]]) -> bool:
+    if complete or df.empty:
+        return True
+    return columns is not None and set(columns) <= set(df.columns)
+
+
+def _select(df: pd.DataFrame, columns: Optional[tuple[str, ...]]) -> pd.DataFrame:
+    return df if columns is None else df.reindex(columns=list(columns))
+
+
+def read_range(
+    view: str,
+    start: Union[str, date],
+    end: Union[str, date],
+    columns: Optional[tuple[str, ...]],
+    fetch_days: Callable[[list[str], Optional[tuple[str, ...]]], dict[str, pd.DataFrame]],
+) -> pd.DataFrame:
+    """
+    [start, end] を日付ごとに メモリ（day_cache）→ 保存済みの Parquet の順に探し、
+    ない日・未確定で古い日・列が足りない日だけを fetch_days(days, columns) で取得して保存する。
+    取り直す日は、保持済みの列と要求された列の和で取得する（ページごとに列が違っても1つで足りる）。
+    """
+    days = pd.date_range(start, end).strftime("%Y-%m-%d").tolist()
+    frames: dict[str, pd.DataFrame] = {}
+    missing: list[str] = []
+    for day in days:
+        df = _lookup(view, day, columns)
+        if df is None:
+            missing.append(day)
+        else:
+            frames[day] = _select(df, columns)
+
+    if missing:
+        if columns is None:
+            fetch_columns = None
+        else:
+            wanted = set(columns)
+            for day in missing:
+                wanted.update(day_cache.columns(view, day))
+                if enabled():
+                    wanted.update(stored_columns(view, day))
+            fetch_columns = tuple(sorted(wanted))
+        fetched = fetch_days(missing, fetch_columns)
+        fetched_at = datetime.now()
+        complete = fetch_columns is None
+        with _lock:
+            for day in missing:
+                df = fetched.get(day, pd.DataFrame(columns=list(fetch_columns or ())))
+                if enabled():
+                    write_day(view, day, df, all_columns=complete)
+                day_cache.put(view, day, df, fetched_at, complete=complete)
+                frames[day] = _select(df, columns)
+
+    return _join_days([frames[day] for day in days], columns)
+
+
+def read_cached(
+    view: str,
+    start: Union[str, date],
+    end: Union[str, date],
+    columns: Optional[tuple[str, ...]],
+) -> Optional[pd.DataFrame]:
+    """
+    [start, end] の全日が メモリ（day_cache）か保存済みの Parquet にあればつないで返す。
+    1日でも足りなければ取得はせずに None を返す
+    """
+    frames = []
+    for day in pd.date_range(start, end).strftime("%Y-%m-%d"):
+        df = _lookup(view, day, columns)
+        if df is None:
+            return None
+        frames.append(_select(df, columns))
+    return _join_days(frames, columns)
+
+
+def _lookup(view: str, day: str, columns: Optional[tuple[str, ...]]) -> Optional[pd.DataFrame]:
+    """1日分を メモリ → 保存済みの Parquet の順に探す（Parquet から読んだらメモリにも置く）"""
+    df = day_cache.get(view, day, columns, is_fresh)
+    if df is None and enabled():
+        stored = read_day(view, day)
+        if stored is not None and _has_columns(stored[0], stored[2], columns):
+            df = stored[0]
+            day_cache.put(view, day, df, stored[1], complete=stored[2])
+    return df
+
+
+def _join_days(frames: list[pd.DataFrame], columns: Optional[tuple[str, ...]]) -> pd.DataFrame:
+    parts = [df for df in frames if not df.empty]
+    if not parts:
+        return pd.DataFrame(columns=list(columns or ()))
+    return _concat_days(parts)
+
+
+def _concat_days(parts: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    日付ごとの DataFrame をつなぐ。
+    category 列は日ごとにカテゴリが違うと object に戻ってしまうため、先にカテゴリをそろえる
+    """
+    for col, dtype in parts[0].dtypes.items():
+        if not isinstance(dtype, pd.CategoricalDtype):
+            continue
+        if not all(isinstance(p[col].dtype, pd.CategoricalDtype) for p in parts):
+            continue
+        categories = union_categoricals([p[col] for p in parts]).categories
+        parts = [p.assign(**{col: p[col].cat.set_categories(categories)}) for p in parts]
+    return pd.concat(parts, ignore_index=True)
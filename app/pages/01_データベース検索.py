@@ -2,9 +2,8 @@ import streamlit as st
 import pandas as pd
 
 import datetime
-import time
 from utils_for_streamlit import auto_height
-from data_from_supabase import fetch
+from features import unit_index
 
 # --- page_config ---
 st.set_page_config(page_title="データベース", page_icon="", layout="wide")
@@ -26,6 +25,8 @@ st.subheader("フィルター設定", divider="rainbow", help=help_text)
 
 # --- 日付処理 ---
 PAST_N_DAYS = 5
+# 表示に使う列だけを取得する
+FETCH_COLUMNS = ("hall", "model", "date", "unit_no", "game", "medal", "bb", "rb")
 today = datetime.date.today()
 n_d_ago = today - datetime.timedelta(days=PAST_N_DAYS)
 yesterday = today - datetime.timedelta(days=1)
@@ -58,28 +59,24 @@ with col2:
     )
 st.write(f"📅 検索期間: {ss.start_date} ～ {ss.end_date}")
 
-df = fetch("result_joined", ss.start_date, ss.end_date, hall=None, model=None)
+# (hall, model, unit_no) で並べ替えた索引（期間ごとにキャッシュ済み）から切り出す
+index = unit_index(ss.start_date, ss.end_date, columns=FETCH_COLUMNS)
 
 # --- リスト&フィルター ---
 col1, col2, col3 = st.columns(3)
 with col1:
-    halls = sorted(df["hall"].unique())
+    halls = index.halls()
     hall = st.selectbox("ホールを選択", halls, help="お気に入り機能追加??")
-    df_hall = df[(df["hall"] == hall)]
-    time.sleep(0.2)
 with col2:
-    models = df_hall["model"].value_counts().index.tolist()
+    models = index.models(hall)
     if len(models) > 6:
         models.insert(6, "すべて表示")
     else:
         models.append("すべて表示")
     model = st.selectbox("機種を選択", models, help="台数の多い順に表示")
-    df_model = df_hall
-    if model != "すべて表示":
-        df_model = df_hall[(df_hall["model"] == model)]
-    time.sleep(0.2)
+    df_model = index.select(hall, None if model == "すべて表示" else model)
 with col3:
-    units = df_model["unit_no"].unique().tolist()
+    units = df_model.index.get_level_values("unit_no").unique().tolist()
     if len(units) > 6:
         units.insert(6, "すべて表示")
     else:
@@ -87,12 +84,11 @@ with col3:
     unit = st.selectbox("台番号を選択", units, help="すべて表示も可能")
     df_unit = df_model
     if unit != "すべて表示":
-        df_unit = df_model[df_model["unit_no"] == unit]
-    time.sleep(0.2)
+        df_unit = index.select(hall, None if model == "すべて表示" else model, unit)
 
 # --- Display ---
 show_cols = ["hall", "model", "date", "unit_no", "game", "medal", "bb", "rb"]
-show_df = df_unit[show_cols]
+show_df = df_unit.reset_index()[show_cols].assign(date=lambda d: d["date"].dt.date)
 
 if len(show_df) > 10:
     height = min(100 + len(show_df) * 30, 800)
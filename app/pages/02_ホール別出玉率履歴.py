@@ -2,11 +2,12 @@ import streamlit as st
 import pandas as pd
 import datetime
 import time
-from data_from_supabase import fetch
-from utils_for_streamlit import HALLS, WEEKDAY_MAP
+from features import features
+from utils_for_streamlit import HALLS
 from utils_for_streamlit import auto_height
 from utils_for_streamlit import style_val
 from utils_for_streamlit import make_style_val
+from utils_for_streamlit import pivot_mean
 
 
 def validate_dates():
@@ -59,23 +60,15 @@ with col2:
     )
 with col3:
     # df = fetch(HALLS, ss.start_date, ss.end_date, model_pattern="ジャグラー")
-    df = fetch("result_joined", ss.start_date, ss.end_date, hall=None, model=None)
+    # day / weekday / day_last / date_label は features で計算済み
+    df = features("hall_date_stats", ss.start_date, ss.end_date)
     halls = ["すべてのホール"] + df["hall"].unique().tolist()
     hall = st.selectbox("ホールを選択", halls)
 
 if hall != "すべてのホール":
     df = df[df["hall"] == hall]
-    
-    
-df["date"] = pd.to_datetime(df["date"])
-df["day"] = df["date"].dt.day
-df["weekday_num"] = df["date"].dt.weekday
-df["weekday"] = df["weekday_num"].map(WEEKDAY_MAP)
-df["day_last"] = df["day"].astype(str).str[-1]
-df["date"] = pd.to_datetime(df["date"]).dt.strftime("%m-%d %a")
 
 
-    
 col1, col2, col3 = st.columns(3)
 with col1:
     day_last_list = ["すべての日"] + sorted(df["day_last"].unique().tolist())
@@ -96,22 +89,9 @@ with col3:
 
 
 # --- pivot_table ---
-games = df.pivot_table(
-    index=["hall"],
-    columns="date",
-    values="game",
-    aggfunc="mean",
-    margins=True,
-    margins_name="SubTotal",
-)
-medals = df.pivot_table(
-    index=["hall"],
-    columns="date",
-    values="medal",
-    aggfunc="mean",
-    margins=True,
-    margins_name="SubTotal",
-)
+# 集計関数で台数と合計まで計算済みなので、平均は 合計 / 台数 で出す
+games = pivot_mean(df, ["hall"], "game_sum", columns="date_label")
+medals = pivot_mean(df, ["hall"], "medal_sum", columns="date_label")
 rate = (games * 3 + medals) / (games * 3)
 sorted_games = games.iloc[:, ::-1]
 sorted_rate = rate.iloc[:, ::-1]
@@ -2,8 +2,9 @@ import streamlit as st
 import pandas as pd
 import datetime
 import time
-from data_from_supabase import fetch
-from utils_for_streamlit import HALLS, WEEKDAY_MAP
+from data_from_supabase import fetch_result_units, fetch_where, make_filters
+from features import add_features, features
+from utils_for_streamlit import HALLS
 from utils_for_streamlit import auto_height
 from utils_for_streamlit import style_val
 from utils_for_streamlit import make_style_val
@@ -15,6 +16,8 @@ def validate_dates():
 
 
 PAST_N_DAYS = 30
+# 集計に使う列だけを取得する
+FETCH_COLUMNS = ("hall", "model", "unit_no", "date", "game", "medal", "bb", "rb")
 
 # --- page_config ---
 st.set_page_config(page_title="台番号別の出玉率・回転数履歴", layout="wide")
@@ -59,63 +62,65 @@ with col2:
     )
 
 ALL = "すべて表示"
+# 選択肢は台ごとに1行の result_units から作り、行データは選択に合う分だけを取得する
 # df_fetch = fetch(HALLS, ss.start_date, ss.end_date, model_pattern="ジャグラー")
-df_fetch = fetch("result_joined", ss.start_date, ss.end_date, hall=None, model=None)
+df_units = fetch_result_units(ss.start_date, ss.end_date)
 
 col1, col2, col3 = st.columns(3)
 # --- 1) ホール選択 ---
-halls = sorted(df_fetch["hall"].unique().tolist()) + [ALL]
+halls = sorted(df_units["hall"].unique().tolist()) + [ALL]
 with col1:
     hall = st.selectbox("ホールを選択", halls)
-df_h = df_fetch if hall == ALL else df_fetch[df_fetch["hall"] == hall]
+df_h = df_units if hall == ALL else df_units[df_units["hall"] == hall]
 # --- 2) モデル選択（ホールに従属）---
 models = sorted(df_h["model"].dropna().unique().tolist()) + [ALL]
 with col2:
     model = st.selectbox("モデルを選択", models)
-df_hm = [ALL] + df_h if model == ALL else df_h[df_h["model"] == model]
+df_hm = df_h if model == ALL else df_h[df_h["model"] == model]
 # --- 3) ユニット選択（ホール＋モデルに従属）---
 units = sorted(df_hm["unit_no"].dropna().unique().tolist()) + [ALL]
 with col3:
     unit = st.selectbox("台番号を選択", units)
-# --- 4) 最終フィルタ（段階結果に基づいて AND 結合）---
-df_filtered = df_hm if unit == ALL else df_hm[df_hm["unit_no"] == unit]
-
-df = df_filtered
-# groupby 用のカラムを追加
-df["BB_rate"] = (df["game"] / df["bb"]).round(1)
-df["RB_rate"] = (df["game"] / df["rb"]).round(1)
-df["Total_rate"] = (df["game"] / (df["bb"]+ df["rb"])).round(1)
-df["date"] = pd.to_datetime(df["date"])
-df["day"] = df["date"].dt.day
-df["weekday_num"] = df["date"].dt.weekday
-df["weekday"] = df["weekday_num"].map(WEEKDAY_MAP)
-df["day_last"] = df["day"].astype(str).str[-1]
-df["date"] = pd.to_datetime(df["date"]).dt.strftime("%m-%d %a")
-
 
+# --- 4) 日付の選択肢は期間から作る ---
+dates = pd.date_range(ss.start_date, ss.end_date)
 col1, col2, col3 = st.columns(3)
 with col1:
-    day_last_list = ["すべて表示"] + sorted(df["day_last"].unique().tolist())
+    day_last_list = ["すべて表示"] + sorted(set((dates.day % 10).tolist()))
     day_last = st.selectbox("末尾日を選択", day_last_list)
-    if day_last != "すべて表示":
-        df = df[df["day_last"] == day_last]
 with col2:
-    day_list = ["すべて表示"] + sorted(df["day"].unique().tolist())
+    days = dates.day if day_last == "すべて表示" else dates.day[dates.day % 10 == day_last]
+    day_list = ["すべて表示"] + sorted(set(days.tolist()))
     day = st.selectbox("毎月〇〇日を選択", day_list)
-    if day != "すべて表示":
-        df = df[df["day"] == day]
 with col3:
     weekday_list = ["すべて表示", "土", "日", "月", "火", "水", "木", "金"]
     weekday = st.selectbox("曜日を選択", weekday_list)
-    if weekday != "すべて表示":
-        df = df[df["weekday"] == weekday]
+
+# --- 5) 選択を Supabase 側の絞り込みにして取得 ---
+filters = make_filters(
+    hall=None if hall == ALL else hall,
+    model=None if model == ALL else model,
+    unit_no=None if unit == ALL else unit,
+    weekday=None if weekday == "すべて表示" else weekday,
+    day=None if day == "すべて表示" else day,
+    day_last=None if day_last == "すべて表示" else day_last,
+)
+if filters:
+    # 選択に合う行だけなので、派生列はその場で付ける
+    df = add_features(fetch_where(ss.start_date, ss.end_date, filters, columns=FETCH_COLUMNS))
+else:
+    # BB_rate / RB_rate / Total_rate / day / weekday / day_last / date_label は features で計算済み
+    df = features("result_joined", ss.start_date, ss.end_date, columns=FETCH_COLUMNS)
 
 
 # --- pivot_table ---
 # ['game', 'BB', 'RB', 'medals', 'BB_rate', 'RB_rate', 'Total_rate']
 st.text(df.columns)
 target_idx = ["hall", "model", "unit_no"]
-pivots = df.pivot_table(index=target_idx, columns="date", aggfunc="sum")
+pivot_vals = ["game", "medal", "RB_rate", "Total_rate"]
+pivots = df.pivot_table(
+    index=target_idx, columns="date_label", values=pivot_vals, aggfunc="sum", observed=True
+)
 games = pivots["game"].iloc[:, ::-1]
 medals = pivots["medal"].iloc[:, ::-1]
 rb_rate = pivots["RB_rate"].iloc[:, ::-1]
@@ -175,7 +180,7 @@ vals = ["game", "medal", "bb", "rb"]
 cols = ["day_last"]
 agg = "sum"
 # pt = df.pivot_table(index=idx, columns=cols, aggfunc=agg, values=vals, margins=True)
-pt = df.pivot_table(index=idx, columns=cols, aggfunc=agg, values=vals)
+pt = df.pivot_table(index=idx, columns=cols, aggfunc=agg, values=vals, observed=True)
 medal_rate = ((pt["game"] * 3 + pt["medal"]) / (pt["game"] * 3)).round(3)
 # medal_rate
 labeled_columns = [("medal_rate", d) for d in medal_rate.columns]
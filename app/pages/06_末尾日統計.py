@@ -3,80 +3,11 @@ import pandas as pd
 from datetime import date, timedelta
 from dateutil.relativedelta import relativedelta
 from utils_for_streamlit import HALLS, WEEKDAY_MAP
-from data_from_supabase import fetch
+from features import features, day_last_cube
 
 
-def pre_process_first(df, is_win=1.03):
-    """データに必要な列を追加する"""
-    df["date"] = pd.to_datetime(df["date"])
-    df["weekday"] = df["date"].dt.day_name()
-    df["BB_rate"] = (df["game"] / df["bb"]).round(1)
-    df["RB_rate"] = (df["game"] / df["rb"]).round(1)
-    df["Total_rate"] = (df["game"] / (df["bb"] + df["rb"])).round(1)
-    df["medal_rate"] = ((df["game"] * 3 + df["medal"]) / (df["game"] * 3)).round(3)
-    df["is_win"] = df["medal_rate"] > is_win
-    df["day"] = df["date"].dt.day
-    df["day_last"] = df["day"].astype(str).str[-1].astype(int)
-    return df
-
-
-def pre_process_groupe(df, group_targets):
-    grouped = df.groupby(group_targets)
-    #
-    unit_count = grouped["game"].count()
-    unit_count.name = "count"
-    #
-    is_win = grouped["is_win"].sum()
-    win_rate = (is_win / unit_count).round(2)
-    win_rate.name = "win_rate"
-
-    game_sum = grouped["game"].sum()
-    game_mean = grouped["game"].mean().round(1)
-    game_mean.name = "game_m"
-    game_std = grouped["game"].std().round(1)
-    game_std.name = "game_std"
-
-    medals = grouped["medal"].sum()
-    medals_mean = grouped["medal"].mean().round(1)
-    medals_mean.name = "medals_m"
-    medals_std = grouped["medal"].std().round(1)
-    medals_std.name = "medals_std"
-
-    rb = grouped["rb"].sum()
-    rb_rate = (game_sum / rb).round(1)
-    rb_rate.name = "rb_rate"
-
-    rb_rate_std = grouped["rb"].std().round(1)
-    rb_rate_std.name = "rb_rate_std"
-
-    cv = (grouped["rb"].std() / grouped["rb"].mean()).round(3)
-    cv.name = "cv"
-
-    bb = grouped["bb"].sum()
-    bb_rate = (game_sum / bb).round(1)
-    bb_rate.name = "bb_rate"
-
-    medal_rate = ((game_sum * 3 + medals) / (game_sum * 3)).round(3)
-    medal_rate.name = "medal_rate"
-
-    for_concat_list = [
-        game_sum,
-        game_mean,
-        unit_count,
-        bb,
-        bb_rate,
-        rb,
-        rb_rate,
-        cv,
-        medals,
-        medals_mean,
-        medal_rate,
-        win_rate,
-    ]
-    df_day_last = pd.concat(for_concat_list, axis=1)
-    df_day_last = df_day_last.reset_index()
-    return df_day_last
-
+# 集計に使う列だけを取得する
+FETCH_COLUMNS = ("hall", "model", "unit_no", "date", "game", "medal", "bb", "rb")
 
 title = "末尾日統計"
 st.set_page_config(page_title=title, layout="wide")
@@ -123,18 +54,6 @@ def adjust_height(df, hall, day):
         return height
 
 
-# 最新の設置状態を取得してインデックスを取得
-def make_df_latest(past_n_days=3):
-    today = date.today()
-    n_d_ago = today - timedelta(days=past_n_days)
-    yesterday = today - timedelta(days=1)
-    # df_latest = fetch(HALLS, n_d_ago, yesterday, model_pattern="ジャグラー")
-    df_latest = fetch("result_joined", n_d_ago, yesterday, hall=None, model=None)
-    df_latest = df_latest.set_index(["hall", "model", "unit_no"])
-    return df_latest
-
-df_latest = make_df_latest()
-
 # 日付カラム
 start_date, end_date = begin_of_month_to_end_of_month(months=1, days=1)
 ss = st.session_state
@@ -161,18 +80,11 @@ with col2:
     )
 
 
-# df読み込んで、最新の設置状態に絞り込み
+# 末尾日ごとの統計を、設置中の台（current_units）に絞ったもの（期間ごとにキャッシュ済み）
 # df = fetch(HALLS, ss.start_date, ss.end_date, model_pattern="ジャグラー")
-df = fetch("result_joined", ss.start_date, ss.end_date, hall=None, model=None)
-
-df = df.set_index(["hall", "model", "unit_no"])
-safe_index = df.index.intersection(df_latest.index)
-df = df.loc[safe_index].reset_index()
-
-df = pre_process_first(df, is_win=1.03)
-df["date"] = pd.to_datetime(df["date"]).dt.strftime("%m-%d-%a")
-group_targets = ["hall", "model", "unit_no", "day_last"]
-df_groupe = pre_process_groupe(df, group_targets)
+df_groupe = day_last_cube(
+    ss.start_date, ss.end_date, columns=FETCH_COLUMNS, is_win=1.03, current_only=True
+)
 
 # --- 選択用リスト作成 ---
 day_list = df_groupe["day_last"].unique().tolist()
@@ -198,21 +110,18 @@ with col3:
     # model = st.selectbox("ホールを選択", models)
     win_rate = st.slider("勝率範囲を選択", 0.0, 1.0, 0.51)
 
-# --- フィルタリング ---
+# --- フィルタリング（集計済みの表に対するマスクだけ）---
 st.text("今設置されている状態に修正 -> df_groupp.iloc[latest_index]")
-df_groupe = df_groupe[df_groupe["game_m"] >= 3000]
-df_groupe = df_groupe[df_groupe["count"] >= 3]
-df_groupe = df_groupe[df_groupe["win_rate"] >= win_rate]
-if hall == "ALL" and day == "ALL":
-    filtered = df_groupe
-elif hall == "ALL" and day != "ALL":
-    filtered = df_groupe[df_groupe["day_last"] == day]
-elif hall != "ALL" and day == "ALL":
-    filtered = df_groupe[df_groupe["hall"] == hall]
-else:
-    filtered = df_groupe[
-        (df_groupe["hall"] == hall) & (df_groupe["day_last"] == day)
-    ]
+mask = (
+    (df_groupe["game_m"] >= 3000)
+    & (df_groupe["count"] >= 3)
+    & (df_groupe["win_rate"] >= win_rate)
+)
+if hall != "ALL":
+    mask &= df_groupe["hall"] == hall
+if day != "ALL":
+    mask &= df_groupe["day_last"] == day
+filtered = df_groupe[mask]
 
 
 show_col = [
@@ -264,6 +173,8 @@ else:
 
     # st.dataframe(df)
 
+    # 詳細は日ごとのデータから（features でキャッシュ済み）
+    df = features("result_joined", ss.start_date, ss.end_date, columns=FETCH_COLUMNS)
     hall_df = df[(df["hall"] == hall) & (df["day_last"] == day)]
     model_df = hall_df[hall_df["model"].isin(models)]
     unit_df = model_df[model_df["unit_no"] == unit]
@@ -273,7 +184,7 @@ else:
         "hall",
         "model",
         "unit_no",
-        "date",
+        "date_label",
         "game",
         "medal",
         "medal_rate",
@@ -287,4 +198,9 @@ else:
         # "day",
         # "day_last",
     ]
-    st.dataframe(show_df[show_cols], height="auto", hide_index=True, width="stretch")
+    st.dataframe(
+        show_df[show_cols].rename(columns={"date_label": "date"}),
+        height="auto",
+        hide_index=True,
+        width="stretch",
+    )
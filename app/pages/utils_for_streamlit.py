@@ -37,6 +37,27 @@ def make_style_val(threshold=1.02):
     return style_val
 
 
+# --- 集計済みデータのピボット ---
+def pivot_mean(
+    df, index, value_sum, count="unit_count", columns="date", margins_name="SubTotal"
+):
+    """
+    合計列と件数列から pivot_table(aggfunc="mean", margins=True) と同じ表を作る。
+    SubTotal も平均の平均ではなく、合計 / 件数で計算する。
+    """
+    kwargs = dict(
+        index=index,
+        columns=columns,
+        aggfunc="sum",
+        margins=True,
+        margins_name=margins_name,
+        observed=True,
+    )
+    sums = df.pivot_table(values=value_sum, **kwargs)
+    counts = df.pivot_table(values=count, **kwargs)
+    return sums / counts
+
+
 HALLS = [
     "EXA FIRST",
     "コンサートホールエフ成増",
@@ -0,0 +1,103 @@
+"""
+add_data_result のレコード作成部分の比較（ネットワーク不要）
+旧実装（iterrows のループ）と build_result_records（列単位の変換）の処理時間を比べる
+
+    python -m benchmarks.bench_add_data_result --rows 300000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from scraper.data_to_supabase import build_result_records
+
+
+def legacy_build_records(df, pref_map, hall_map, model_map) -> list[dict]:
+    """変更前の add_data_result と同じ iterrows のループ（ログ出力は除く）"""
+    records = []
+    for _, row in df.iterrows():
+        pid = pref_map.get(row["pref"])
+        if not pid:
+            continue
+        hall_id = hall_map.get((pid, row["hall"]))
+        if not hall_id:
+            continue
+        model_id = model_map.get(row["model"])
+        if not model_id:
+            continue
+        try:
+            unit_no = int(row["unit_no"])
+            game = int(row["game"])
+            bb = int(row["bb"])
+            rb = int(row["rb"])
+            medal = int(row["medal"])
+        except (TypeError, ValueError):
+            continue
+        records.append(
+            {
+                "hall_id": hall_id,
+                "model_id": model_id,
+                "unit_no": unit_no,
+                "date": str(row["date"]),
+                "game": game,
+                "bb": bb,
+                "rb": rb,
+                "medal": medal,
+            }
+        )
+    return records
+
+
+def make_data(rows: int, seed: int = 0):
+    """ホール 20 / 機種 9 / 日付 180 日分のダミーデータと ID マップを作る"""
+    rng = np.random.default_rng(seed)
+    prefs = ["東京都", "埼玉県"]
+    halls = [f"hall_{i}" for i in range(20)]
+    models = [f"model_{i}" for i in range(9)]
+    dates = pd.date_range("2025-01-01", periods=180).strftime("%Y-%m-%d")
+
+    hall_idx = rng.integers(0, len(halls), rows)
+    df = pd.DataFrame(
+        {
+            "pref": [prefs[i % 2] for i in hall_idx],
+            "hall": [halls[i] for i in hall_idx],
+            "model": rng.choice(models, rows),
+            "date": rng.choice(dates, rows),
+            "unit_no": rng.integers(1, 1000, rows).astype(str),
+            "game": rng.integers(0, 9000, rows),
+            "bb": rng.integers(0, 40, rows).astype(str),
+            "rb": rng.integers(0, 40, rows).astype(str),
+            "medal": rng.integers(-3000, 5000, rows),
+        }
+    )
+    # 不正な行を少し混ぜる
+    df.loc[df.sample(frac=0.001, random_state=seed).index, "bb"] = "-"
+    df.loc[df.sample(frac=0.001, random_state=seed + 1).index, "model"] = "unknown"
+
+    pref_map = {p: i + 1 for i, p in enumerate(prefs)}
+    hall_map = {(pref_map[prefs[i % 2]], h): i + 1 for i, h in enumerate(halls)}
+    model_map = {m: i + 1 for i, m in enumerate(models)}
+    return df, pref_map, hall_map, model_map
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    df, pref_map, hall_map, model_map = make_data(args.rows)
+
+    start = time.perf_counter()
+    legacy = legacy_build_records(df, pref_map, hall_map, model_map)
+    legacy_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    records, rejected = build_result_records(df, pref_map, hall_map, model_map)
+    vector_sec = time.perf_counter() - start
+
+    assert records == legacy, "旧実装と結果が一致しません"
+    print(f"rows: {args.rows:,} / records: {len(records):,} / rejected: {len(rejected):,}")
+    print(f"iterrows: {legacy_sec:.2f} 秒")
+    print(f"vectorized: {vector_sec:.2f} 秒 ({legacy_sec / vector_sec:.1f} 倍)")
@@ -0,0 +1,93 @@
+"""
+06_末尾日統計 の再実行（スライダーを動かすたび）にかかる時間の比較（ネットワーク不要）
+変更前: 毎回 groupby を列ごとに十数回 + concat してから絞り込む
+変更後: build_day_last_cube（1回の名前付き集計）はキャッシュ済みで、毎回はマスクで絞り込むだけ
+
+    python -m benchmarks.bench_day_last_cube --days 30
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# app/ のモジュールは app/ を起点に import し合うため、パスに追加する
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from benchmarks.bench_typed_frame import make_rows
+from data_from_supabase import _to_frame
+from features import add_features, build_day_last_cube
+
+
+def pre_process_groupe(df: pd.DataFrame) -> pd.DataFrame:
+    """変更前のページと同じ集計（列ごとに groupby して concat）"""
+    df = df.assign(is_win=df["medal_rate"] > 1.03)
+    grouped = df.groupby(["hall", "model", "unit_no", "day_last"], observed=True)
+    unit_count = grouped["game"].count().rename("count")
+    win_rate = (grouped["is_win"].sum() / unit_count).round(2).rename("win_rate")
+    game_sum = grouped["game"].sum()
+    game_mean = grouped["game"].mean().round(1).rename("game_m")
+    grouped["game"].std()
+    medals = grouped["medal"].sum()
+    medals_mean = grouped["medal"].mean().round(1).rename("medals_m")
+    grouped["medal"].std()
+    rb = grouped["rb"].sum()
+    rb_rate = (game_sum / rb).round(1).rename("rb_rate")
+    grouped["rb"].std()
+    cv = (grouped["rb"].std() / grouped["rb"].mean()).round(3).rename("cv")
+    bb = grouped["bb"].sum()
+    bb_rate = (game_sum / bb).round(1).rename("bb_rate")
+    medal_rate = ((game_sum * 3 + medals) / (game_sum * 3)).round(3).rename("medal_rate")
+    parts = [
+        game_sum, game_mean, unit_count, bb, bb_rate, rb, rb_rate,
+        cv, medals, medals_mean, medal_rate, win_rate,
+    ]
+    return pd.concat(parts, axis=1).reset_index()
+
+
+def select(df_groupe: pd.DataFrame, win_rate: float, hall: str, day: int) -> pd.DataFrame:
+    mask = (
+        (df_groupe["game_m"] >= 3000)
+        & (df_groupe["count"] >= 3)
+        & (df_groupe["win_rate"] >= win_rate)
+        & (df_groupe["hall"] == hall)
+        & (df_groupe["day_last"] == day)
+    )
+    return df_groupe[mask]
+
+
+def timeit(func, repeat: int) -> float:
+    """repeat 回の平均（ミリ秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    df = add_features(_to_frame(make_rows(args.days)))
+    hall, day = df["hall"].iloc[0], 1
+
+    # 結果が同じこと
+    before = pre_process_groupe(df).sort_values(["hall", "model", "unit_no", "day_last"])
+    cube = build_day_last_cube(df)
+    after = cube[before.columns]
+    pd.testing.assert_frame_equal(
+        before.reset_index(drop=True), after.reset_index(drop=True), check_dtype=False
+    )
+
+    before_ms = timeit(lambda: select(pre_process_groupe(df), 0.5, hall, day), args.repeat)
+    build_ms = timeit(lambda: build_day_last_cube(df), args.repeat)
+    rerun_ms = timeit(lambda: select(cube, 0.5, hall, day), args.repeat)
+
+    print(f"rows: {len(df):,} / cube: {len(cube):,} 行")
+    print(f"変更前（毎回 groupby + concat + 絞り込み）: {before_ms:.1f} ms")
+    print(f"変更後 キューブ作成（期間ごとに1回）:       {build_ms:.1f} ms")
+    print(f"変更後 再実行（マスクで絞り込みのみ）:       {rerun_ms:.2f} ms ({before_ms / rerun_ms:.0f} 倍)")
@@ -0,0 +1,105 @@
+"""
+_fetch_all_rows のページング方式の比較（Supabase に接続する）
+OFFSET（range）とキーセット（前ページ最後のキーより後ろ）で、ページごとの取得時間を比べる
+あわせて、期間まとめての順次取得と日付ごとの並列取得（_fetch_by_day）の時間と結果を比べる
+
+    SUPABASE_URL=... SUPABASE_ANON_KEY=... python -m benchmarks.bench_fetch_pagination --start 2025-11-01 --end 2025-11-30
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# app/ のモジュールは app/ を起点に import し合うため、パスに追加する
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from data_from_supabase import (
+    FETCH_WORKERS,
+    KEYSET_COLUMNS,
+    _fetch_by_day,
+    _keyset_filter,
+    get_supabase_client,
+)
+
+
+def fetch_offset(make_query, page_size: int) -> tuple[list[dict], list[float]]:
+    """変更前と同じ range(offset) のページング（ページごとの秒数も返す）"""
+    rows, times = [], []
+    page = 0
+    while True:
+        query = make_query()
+        for key in KEYSET_COLUMNS:
+            query = query.order(key)
+        start = time.perf_counter()
+        data = query.range(page * page_size, (page + 1) * page_size - 1).execute().data
+        times.append(time.perf_counter() - start)
+        rows.extend(data)
+        if len(data) < page_size:
+            return rows, times
+        page += 1
+
+
+def fetch_keyset(make_query, page_size: int) -> tuple[list[dict], list[float]]:
+    """_fetch_all_rows_keyset と同じページング（ページごとの秒数も返す）"""
+    rows, times = [], []
+    last = None
+    while True:
+        query = make_query()
+        for key in KEYSET_COLUMNS:
+            query = query.order(key)
+        if last is not None:
+            query = query.or_(_keyset_filter(KEYSET_COLUMNS, last))
+        start = time.perf_counter()
+        data = query.limit(page_size).execute().data
+        times.append(time.perf_counter() - start)
+        rows.extend(data)
+        if len(data) < page_size:
+            return rows, times
+        last = data[-1]
+
+
+def summary(name: str, times: list[float]) -> None:
+    ms = [t * 1000 for t in times]
+    n = len(ms)
+    head = sum(ms[: max(1, n // 4)]) / max(1, n // 4)
+    tail = sum(ms[-max(1, n // 4) :]) / max(1, n // 4)
+    print(
+        f"{name:8s} pages: {n:3d} / total: {sum(ms) / 1000:.2f} 秒 / "
+        f"先頭1/4: {head:.0f} ms/page / 末尾1/4: {tail:.0f} ms/page"
+    )
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--view", default="result_joined")
+    parser.add_argument("--start", required=True)
+    parser.add_argument("--end", required=True)
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    supabase = get_supabase_client()
+
+    def make_query():
+        return supabase.table(args.view).select("*").gte("date", args.start).lte("date", args.end)
+
+    offset_rows, offset_times = fetch_offset(make_query, args.page_size)
+    keyset_rows, keyset_times = fetch_keyset(make_query, args.page_size)
+
+    assert offset_rows == keyset_rows, "OFFSET とキーセットで結果が一致しません"
+    print(f"rows: {len(keyset_rows):,}")
+    summary("offset", offset_times)
+    summary("keyset", keyset_times)
+
+    def make_day_query(day_start, day_end):
+        return supabase.table(args.view).select("*").gte("date", day_start).lte("date", day_end)
+
+    start = time.perf_counter()
+    sequential = _fetch_by_day(make_day_query, args.start, args.end, workers=1)
+    sequential_sec = time.perf_counter() - start
+    start = time.perf_counter()
+    parallel = _fetch_by_day(make_day_query, args.start, args.end, workers=FETCH_WORKERS)
+    parallel_sec = time.perf_counter() - start
+
+    assert sequential == parallel, "順次取得と並列取得で結果が一致しません"
+    print(f"順次: {sequential_sec:.2f} 秒 / 日付ごと並列 ({FETCH_WORKERS} 本): {parallel_sec:.2f} 秒")
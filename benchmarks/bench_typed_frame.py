@@ -0,0 +1,69 @@
+"""
+Supabase の返却行から DataFrame を作るときのメモリ比較（ネットワーク不要）
+pd.DataFrame(rows) と _to_frame(rows)（列ごとに category / datetime64 / 小さい整数）を比べる
+
+    python -m benchmarks.bench_typed_frame --days 30
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# app/ のモジュールは app/ を起点に import し合うため、パスに追加する
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from data_from_supabase import _to_frame, frame_memory
+
+
+def make_rows(days: int, units_per_hall: int = 400, seed: int = 0) -> list[dict]:
+    """result_joined の JSON と同じ形（1行1 dict）のダミーデータ"""
+    rng = np.random.default_rng(seed)
+    halls = [f"ホール{i}" for i in range(11)]
+    models = [f"マイジャグラー{i}" for i in range(9)]
+    rows = []
+    for date in pd.date_range("2025-11-01", periods=days).strftime("%Y-%m-%d"):
+        for hall in halls:
+            for unit_no in range(1, units_per_hall + 1):
+                rows.append(
+                    {
+                        "pref": "東京都",
+                        "hall": hall,
+                        "model": models[unit_no % len(models)],
+                        "date": date,
+                        "unit_no": unit_no,
+                        "game": int(rng.integers(0, 9000)),
+                        "bb": int(rng.integers(0, 40)),
+                        "rb": int(rng.integers(0, 40)),
+                        "medal": int(rng.integers(-3000, 5000)),
+                    }
+                )
+    return rows
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+
+    rows = make_rows(args.days)
+
+    start = time.perf_counter()
+    plain = pd.DataFrame(rows)
+    plain_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    typed = _to_frame(rows)
+    typed_sec = time.perf_counter() - start
+
+    assert (typed["hall"].astype(str) == plain["hall"]).all()
+    assert (typed["medal"] == plain["medal"]).all()
+
+    before, after = frame_memory(plain), frame_memory(typed)
+    print(f"rows: {len(rows):,}")
+    print(f"pd.DataFrame(rows): {before / 1024**2:.1f} MB ({plain_sec:.2f} 秒)")
+    print(f"_to_frame(rows):    {after / 1024**2:.1f} MB ({typed_sec:.2f} 秒, {before / after:.1f} 分の1)")
+    print(typed.dtypes.to_string())
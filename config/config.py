@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from dataclasses import dataclass
 
@@ -6,15 +7,72 @@ MAIN_URL = "https://min-repo.com/tag/"
 
 HALLS_YAML = "config/halls.yaml"
 
+# スクレイピングの並列数（1 のときは従来どおり直列）
+SCRAPE_WORKERS = int(os.environ.get("SCRAPE_WORKERS", "1"))
+# 同一ホストへの同時アクセス上限
+SCRAPE_PER_HOST_LIMIT = int(os.environ.get("SCRAPE_PER_HOST_LIMIT", "4"))
+# 取得済みホールを前処理・アップロードへ渡すキューの上限（ホール数）
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", "4"))
+# results への upsert（バッチ件数・並列数・再送回数・再送待ちの基準秒）
+UPLOAD_BATCH_SIZE = int(os.environ.get("UPLOAD_BATCH_SIZE", "1000"))
+UPLOAD_WORKERS = int(os.environ.get("UPLOAD_WORKERS", "4"))
+UPLOAD_MAX_RETRIES = int(os.environ.get("UPLOAD_MAX_RETRIES", "3"))
+UPLOAD_BACKOFF_SECONDS = float(os.environ.get("UPLOAD_BACKOFF_SECONDS", "1.0"))
+# 過去データの一括投入（読み込みチャンク行数・日付シャードの日数）
+BACKFILL_CHUNK_SIZE = int(os.environ.get("BACKFILL_CHUNK_SIZE", "100000"))
+BACKFILL_SHARD_DAYS = int(os.environ.get("BACKFILL_SHARD_DAYS", "31"))
+# PostgreSQL への直接接続（設定時は COPY で投入、未設定時は REST の upsert）
+DATABASE_URL = os.environ.get("SUPABASE_DB_URL")
+# ページ取得のバックエンド ("playwright" or "http")
+SCRAPER_BACKEND = os.environ.get("SCRAPER_BACKEND", "playwright")
+# http バックエンドで取得できなかったホールを Playwright で取り直すか
+SCRAPER_FALLBACK = os.environ.get("SCRAPER_FALLBACK", "1") == "1"
+
+# ブラウザで読み込まないリクエスト（DOM のテキストだけ取れればよいため）
+# stylesheet は innerText（非表示要素の扱い）が変わるためブロックしない
+BLOCK_REQUESTS = os.environ.get("BLOCK_REQUESTS", "1") == "1"
+BLOCK_RESOURCE_TYPES = ["image", "media", "font"]
+BLOCK_URL_PATTERNS = [
+    "*googletagmanager.com*",
+    "*google-analytics.com*",
+    "*googlesyndication.com*",
+    "*doubleclick.net*",
+    "*adservice.google.*",
+    "*amazon-adsystem.com*",
+    "*criteo.*",
+    "*facebook.net*",
+    "*twitter.com/widgets*",
+]
+# 上記に当てはまっても読み込むリクエスト（例: "*min-repo.com/wp-content/*.png"）
+ALLOW_URL_PATTERNS: list[str] = []
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 LOG_DIR = BASE_DIR / DATA_DIR / "logs"
 CSV_DIR = BASE_DIR / DATA_DIR / "csv"
 IMG_DIR = BASE_DIR / DATA_DIR / "imgs"
+STATE_DIR = BASE_DIR / DATA_DIR / "state"
+CHECKPOINT_DIR = BASE_DIR / DATA_DIR / "checkpoints"
+DEAD_LETTER_DIR = STATE_DIR / "dead_letter"
 
 LOG_PATH = LOG_DIR / 'minrepo.log'
 
-for d in [DATA_DIR, LOG_DIR, CSV_DIR, IMG_DIR]:
+# 取得済み (hall, date, model_url) の記録と保持日数
+MANIFEST_PATH = STATE_DIR / "scrape_manifest.csv"
+MANIFEST_KEEP_DAYS = 30
+
+# prefectures / halls / models の name → ID キャッシュと有効日数
+MASTER_CACHE_PATH = STATE_DIR / "master_ids.json"
+MASTER_CACHE_TTL_DAYS = 7
+
+# 送信済み results の内容ハッシュ（差分アップロード用）
+RESULT_HASH_PATH = STATE_DIR / "result_hashes.csv"
+RESULT_HASH_KEEP_DAYS = 60
+
+# ホール・日付単位のチェックポイントを残す実行回数
+CHECKPOINT_KEEP_RUNS = 3
+
+for d in [DATA_DIR, LOG_DIR, CSV_DIR, IMG_DIR, STATE_DIR, CHECKPOINT_DIR]:
     d.mkdir(exist_ok=True)
 
 
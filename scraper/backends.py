@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+from typing import Callable
+
+from config import config
+from scraper.browser_session import BrowserSession, ScrapeSession
+from scraper import scraping_hall_page, scraping_date_page, scraping_model_page
+from scraper import http_backend
+
+
+# =========================
+# 取得バックエンド
+# =========================
+@dataclass(frozen=True)
+class Backend:
+    """セッションの種類と、同じシグネチャの取得関数の組"""
+
+    name: str
+    session_factory: Callable[[], ScrapeSession]
+    extract_date_url: Callable
+    extract_model_url: Callable
+    extract_model_data: Callable
+
+
+BACKENDS: dict[str, Backend] = {
+    "playwright": Backend(
+        name="playwright",
+        session_factory=BrowserSession,
+        extract_date_url=scraping_hall_page.extract_date_url,
+        extract_model_url=scraping_date_page.extract_model_url,
+        extract_model_data=scraping_model_page.extract_model_data,
+    ),
+    "http": Backend(
+        name="http",
+        session_factory=http_backend.HttpSession,
+        extract_date_url=http_backend.extract_date_url,
+        extract_model_url=http_backend.extract_model_url,
+        extract_model_data=http_backend.extract_model_data,
+    ),
+}
+
+
+def get_backend(name: str = config.SCRAPER_BACKEND) -> Backend:
+    if name not in BACKENDS:
+        raise ValueError(f"未対応のバックエンドです: {name} (選択肢: {list(BACKENDS)})")
+    return BACKENDS[name]
+
+
+def open_session(name: str = config.SCRAPER_BACKEND) -> ScrapeSession:
+    """設定に応じたセッションを作成する（with 文で使用）"""
+    return get_backend(name).session_factory()
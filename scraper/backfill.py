@@ -0,0 +1,365 @@
+"""
+過去データの一括投入（CSV / SQLite → results）
+
+    python -m scraper.backfill data/csv/minrepo_01_from_sqlite.csv --start 2024-01-01 --end 2025-10-31
+    python -m scraper.backfill data/db/minrepo_02.db --sqlite-table result_data --shard-days 7 --workers 2
+
+入力は cleaned_all_result_data.csv と同じ列（pref, hall, model, date, unit_no, game, bb, rb, medal）。
+SUPABASE_DB_URL があれば PostgreSQL に直接つなぎ、COPY で一時テーブルへ入れてから results にマージする。
+なければ従来どおり REST の upsert_batches で送る。
+どちらも ON CONFLICT で上書きするため、途中で止まっても同じ範囲を流し直せばよい。
+"""
+import argparse
+import datetime as dt
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Iterator
+
+import pandas as pd
+
+from config import config
+from utils.logger_setup import setup_logger
+from scraper import data_to_supabase
+from scraper.data_to_supabase import RESULT_COLUMNS, build_result_frame, report_rejected
+from scraper.master_cache import MasterCache, get_master_cache
+from scraper.upload_engine import upsert_batches
+
+try:
+    import psycopg
+    from psycopg import sql
+    from psycopg.rows import dict_row
+except ImportError:  # COPY を使わない（REST だけの）環境では不要
+    psycopg = None
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+RESULT_KEY = ["hall_id", "model_id", "unit_no", "date"]
+
+
+@dataclass
+class Shard:
+    start: str | None
+    end: str | None
+
+    @property
+    def label(self) -> str:
+        return f"{self.start or '...'}〜{self.end or '...'}"
+
+
+def make_shards(start: str | None, end: str | None, days: int) -> list[Shard]:
+    """[start, end] を days 日ごとに区切る（範囲指定がないときは全体で1シャード）"""
+    if not start or not end:
+        return [Shard(start, end)]
+    shards = []
+    cur = dt.date.fromisoformat(start)
+    last = dt.date.fromisoformat(end)
+    while cur <= last:
+        stop = min(cur + dt.timedelta(days=days - 1), last)
+        shards.append(Shard(cur.isoformat(), stop.isoformat()))
+        cur = stop + dt.timedelta(days=1)
+    return shards
+
+
+# =========================
+# 入力の読み込み（チャンク単位）
+# =========================
+def iter_source_chunks(
+    source: str, shard: Shard, chunksize: int, sqlite_table: str
+) -> Iterator[pd.DataFrame]:
+    """
+    source を chunksize 行ずつ読み、shard の日付範囲の行だけを返す
+    （CSV はシャードごとに全体を読み直すため、シャードが多いときは SQLite の方が速い）
+    """
+    if source.endswith((".db", ".sqlite", ".sqlite3")):
+        chunks = _read_sqlite(source, shard, chunksize, sqlite_table)
+    else:
+        chunks = pd.read_csv(source, chunksize=chunksize, dtype={"unit_no": str})
+
+    for chunk in chunks:
+        chunk["date"] = pd.to_datetime(chunk["date"]).dt.strftime("%Y-%m-%d")
+        if shard.start:
+            chunk = chunk[chunk["date"] >= shard.start]
+        if shard.end:
+            chunk = chunk[chunk["date"] <= shard.end]
+        if not chunk.empty:
+            yield chunk
+
+
+def _read_sqlite(
+    source: str, shard: Shard, chunksize: int, table: str
+) -> Iterator[pd.DataFrame]:
+    """SQLite は日付範囲を WHERE に入れて、必要な行だけを読む"""
+    conn = sqlite3.connect(source)
+    try:
+        # date が 'YYYY-MM-DD HH:MM:SS' でも拾えるよう、終了日の翌日未満で絞る
+        query = f'SELECT * FROM "{table}" WHERE date >= ? AND date < ?'
+        end = dt.date.fromisoformat(shard.end) + dt.timedelta(days=1) if shard.end else None
+        params = (shard.start or "0000-00-00", end.isoformat() if end else "9999-99-99")
+        yield from pd.read_sql_query(query, conn, params=params, chunksize=chunksize)
+    finally:
+        conn.close()
+
+
+# =========================
+# PostgreSQL への直接書き込み
+# =========================
+class _PgTable:
+    """supabase.table(name) と同じ呼び方（upsert / select → execute）で使える最小限のテーブル"""
+
+    def __init__(self, conn, name: str):
+        self.conn = conn
+        self.name = name
+        self._query = None
+
+    def upsert(self, rows: list[dict], on_conflict: str) -> "_PgTable":
+        cols = list(rows[0])
+        keys = [c.strip() for c in on_conflict.split(",")]
+        values = sql.SQL(", ").join(
+            sql.SQL("({})").format(sql.SQL(", ").join(sql.Placeholder() * len(cols)))
+            for _ in rows
+        )
+        # DO NOTHING だと既存行が返らないため、キー列を自分自身で更新して RETURNING させる
+        self._query = (
+            sql.SQL("INSERT INTO {} ({}) VALUES {} ON CONFLICT ({}) DO UPDATE SET {} RETURNING *").format(
+                sql.Identifier(self.name),
+                sql.SQL(", ").join(map(sql.Identifier, cols)),
+                values,
+                sql.SQL(", ").join(map(sql.Identifier, keys)),
+                sql.SQL(", ").join(
+                    sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(k)) for k in keys
+                ),
+            ),
+            [r[c] for r in rows for c in cols],
+        )
+        return self
+
+    def select(self, columns: str) -> "_PgTable":
+        cols = [c.strip() for c in columns.split(",")]
+        self._query = (
+            sql.SQL("SELECT {} FROM {}").format(
+                sql.SQL(", ").join(map(sql.Identifier, cols)), sql.Identifier(self.name)
+            ),
+            [],
+        )
+        return self
+
+    def execute(self) -> SimpleNamespace:
+        query, params = self._query
+        with self.conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(query, params)
+            return SimpleNamespace(data=cur.fetchall())
+
+
+class _PgRpc:
+    """supabase.rpc(name, params) と同じ呼び方（execute → data に戻り値）で使える関数呼び出し（スカラーを返す関数のみ）"""
+
+    def __init__(self, conn, name: str, params: dict):
+        self.conn = conn
+        self.name = name
+        self.params = params
+
+    def execute(self) -> SimpleNamespace:
+        query = sql.SQL("SELECT {}({})").format(
+            sql.Identifier(self.name),
+            sql.SQL(", ").join(
+                sql.SQL("{} => {}").format(sql.Identifier(k), sql.Placeholder())
+                for k in self.params
+            ),
+        )
+        with self.conn.cursor() as cur:
+            cur.execute(query, list(self.params.values()))
+            return SimpleNamespace(data=cur.fetchone()[0])
+
+
+class PgClient:
+    """
+    PostgreSQL に直接つなぐクライアント。
+    マスタ登録は add_model / add_prefecture_and_hall をそのまま使えるよう table() を持ち、
+    results は copy_results で COPY → マージする
+    """
+
+    def __init__(self, url: str):
+        if psycopg is None:
+            raise RuntimeError("SUPABASE_DB_URL を使うには psycopg が必要です（pip install psycopg）")
+        self.conn = psycopg.connect(url, autocommit=True)
+
+    def table(self, name: str) -> _PgTable:
+        return _PgTable(self.conn, name)
+
+    def rpc(self, name: str, params: dict) -> _PgRpc:
+        return _PgRpc(self.conn, name, params)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def copy_results(self, frame: pd.DataFrame) -> int:
+        """frame を一時テーブルへ COPY し、1トランザクションで results にマージする"""
+        buf = io.StringIO()
+        frame[RESULT_COLUMNS].to_csv(buf, index=False, header=False)
+        with self.conn.transaction(), self.conn.cursor() as cur:
+            cur.execute(
+                "CREATE TEMP TABLE results_staging ("
+                " hall_id integer, model_id integer, unit_no integer, date date,"
+                " game integer, bb integer, rb integer, medal integer"
+                ") ON COMMIT DROP"
+            )
+            with cur.copy(
+                "COPY results_staging ({}) FROM STDIN WITH (FORMAT csv)".format(
+                    ", ".join(RESULT_COLUMNS)
+                )
+            ) as copy:
+                copy.write(buf.getvalue())
+            # 同じキーが入力に重複していてもマージできるよう1行に絞る
+            # 内容が同じ既存行は更新しない
+            cur.execute(
+                f"""
+                INSERT INTO results ({", ".join(RESULT_COLUMNS)})
+                SELECT DISTINCT ON ({", ".join(RESULT_KEY)}) {", ".join(RESULT_COLUMNS)}
+                FROM results_staging
+                ORDER BY {", ".join(RESULT_KEY)}
+                ON CONFLICT ({", ".join(RESULT_KEY)}) DO UPDATE
+                SET game = EXCLUDED.game, bb = EXCLUDED.bb, rb = EXCLUDED.rb, medal = EXCLUDED.medal
+                WHERE (results.game, results.bb, results.rb, results.medal)
+                    IS DISTINCT FROM (EXCLUDED.game, EXCLUDED.bb, EXCLUDED.rb, EXCLUDED.medal)
+                """
+            )
+            return cur.rowcount
+
+
+# =========================
+# 進捗
+# =========================
+class Progress:
+    """
+    全シャード合計の読み込み・書き込み件数と速度をログに出す。
+    除外した行もここに集め、最後にまとめて rejected_results.csv に書く（シャードのスレッドからは書かない）
+    """
+
+    def __init__(self, shards: int):
+        self.shards = shards
+        self.done = 0
+        self.read = 0
+        self.written = 0
+        self.rejected = 0
+        self.rejected_frames: list[pd.DataFrame] = []
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def add(self, read: int, written: int, rejected: pd.DataFrame) -> None:
+        with self.lock:
+            self.read += read
+            self.written += written
+            self.rejected += len(rejected)
+            if not rejected.empty:
+                self.rejected_frames.append(rejected)
+
+    def rejected_rows(self) -> pd.DataFrame:
+        with self.lock:
+            if not self.rejected_frames:
+                return pd.DataFrame()
+            return pd.concat(self.rejected_frames, ignore_index=True)
+
+    def shard_done(self, shard: Shard) -> None:
+        with self.lock:
+            self.done += 1
+            sec = time.perf_counter() - self.start
+            logger.info(
+                f"[{self.done}/{self.shards}] {shard.label} 完了 / 読み込み {self.read:,} 行 / "
+                f"書き込み {self.written:,} 行 / 除外 {self.rejected:,} 行 / "
+                f"{sec:.0f} 秒 ({self.read / sec if sec else 0:,.0f} 行/秒)"
+            )
+
+
+# =========================
+# 投入
+# =========================
+def backfill_shard(
+    source: str, shard: Shard, client, cache: MasterCache, args, progress: Progress
+) -> None:
+    """1シャード分をチャンクごとに ID 解決 → 書き込みする"""
+    for chunk in iter_source_chunks(source, shard, args.chunksize, args.sqlite_table):
+        # 新しい名前だけマスタに登録し、ID はキャッシュからまとめて引く
+        data_to_supabase.add_model(chunk, client, cache)
+        data_to_supabase.add_prefecture_and_hall(chunk, client, cache)
+        with cache.lock:
+            maps = dict(cache.prefectures), dict(cache.halls), dict(cache.models)
+        frame, rejected = build_result_frame(chunk, *maps)
+
+        if isinstance(client, PgClient):
+            client.copy_results(frame)
+        else:
+            result = upsert_batches(
+                client, "results", frame.to_dict("records"),
+                on_conflict=",".join(RESULT_KEY),
+            )
+            if result.failed:
+                raise RuntimeError(
+                    f"results upsert 失敗: {result.failed} 件 -> {result.dead_letter}"
+                )
+        progress.add(len(chunk), len(frame), rejected)
+    progress.shard_done(shard)
+
+
+def backfill(source: str, args) -> None:
+    shards = make_shards(args.start, args.end, args.shard_days)
+    mode = "COPY" if args.db_url else "REST"
+    logger.info(f"バックフィル開始: {source} / {len(shards)} シャード / {mode}")
+    progress = Progress(len(shards))
+    if args.db_url:
+        # 接続先ごとに ID が違うため、REST 用（Supabase 本番）とはキャッシュを分ける
+        digest = hashlib.sha1(args.db_url.encode()).hexdigest()[:8]
+        cache = MasterCache(config.STATE_DIR / f"master_ids_{digest}.json")
+    else:
+        cache = get_master_cache()
+
+    def run(shard: Shard) -> None:
+        # 接続はスレッドごとに持つ
+        client = PgClient(args.db_url) if args.db_url else data_to_supabase.get_supabase_client()
+        try:
+            backfill_shard(source, shard, client, cache, args, progress)
+        finally:
+            if isinstance(client, PgClient):
+                client.close()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers), thread_name_prefix="backfill") as pool:
+            for f in [pool.submit(run, s) for s in shards]:
+                f.result()
+    finally:
+        # 途中で止まっても、それまでに除外した行は残す
+        report_rejected(progress.rejected_rows())
+
+    # 投入した日付で「設置中の台」を作り直す
+    client = PgClient(args.db_url) if args.db_url else data_to_supabase.get_supabase_client()
+    try:
+        data_to_supabase.refresh_current_units(client)
+    finally:
+        if isinstance(client, PgClient):
+            client.close()
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="過去データを results に一括投入する")
+    parser.add_argument("source", help="CSV または SQLite（.db / .sqlite）")
+    parser.add_argument("--sqlite-table", default="result_data", help="SQLite の読み込み元テーブル")
+    parser.add_argument("--start", help="開始日 YYYY-MM-DD")
+    parser.add_argument("--end", help="終了日 YYYY-MM-DD")
+    parser.add_argument("--shard-days", type=int, default=config.BACKFILL_SHARD_DAYS)
+    parser.add_argument("--chunksize", type=int, default=config.BACKFILL_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=1, help="並列に処理するシャード数")
+    parser.add_argument("--db-url", default=config.DATABASE_URL, help="未指定時は SUPABASE_DB_URL")
+    args = parser.parse_args()
+
+    backfill(args.source, args)
@@ -0,0 +1,237 @@
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from fnmatch import fnmatch
+from typing import Iterator
+import os
+import time
+
+import pandas as pd
+from playwright.sync_api import Browser, Page, Playwright, Response, Route, sync_playwright
+
+from config import config
+from utils.logger_setup import setup_logger
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# ブラウザセッション
+# =========================
+@dataclass
+class RequestStats:
+    requests: int = 0
+    blocked: int = 0
+    loaded_bytes: int = 0
+
+
+@dataclass
+class HallTiming:
+    hall_url: str
+    seconds: float
+    rows: int = 0
+    ok: bool = True
+    requests: int = 0
+    blocked: int = 0
+    loaded_bytes: int = 0
+
+
+def should_block(url: str, resource_type: str) -> bool:
+    """config のブロック対象（リソース種別・URL パターン）に当てはまるか"""
+    if any(fnmatch(url, p) for p in config.ALLOW_URL_PATTERNS):
+        return False
+    if resource_type in config.BLOCK_RESOURCE_TYPES:
+        return True
+    return any(fnmatch(url, p) for p in config.BLOCK_URL_PATTERNS)
+
+
+@dataclass
+class ScrapeSession:
+    """
+    1回の実行で使い回すセッションの共通部分（ホール別の処理時間の記録）。
+    backend は scraper.backends で使う取得関数の組を表す。
+    """
+
+    backend = ""
+
+    launch_seconds: float = 0.0
+    timings: list[HallTiming] = field(default_factory=list)
+    request_stats: RequestStats = field(default_factory=RequestStats)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        pass
+
+    @contextmanager
+    def timed(self, hall_url: str) -> Iterator[HallTiming]:
+        """ホール単位の処理時間を記録する"""
+        timing = HallTiming(hall_url=hall_url, seconds=0.0)
+        self.request_stats = RequestStats()
+        start = time.perf_counter()
+        try:
+            yield timing
+        except Exception:
+            timing.ok = False
+            raise
+        finally:
+            timing.seconds = time.perf_counter() - start
+            timing.requests = self.request_stats.requests
+            timing.blocked = self.request_stats.blocked
+            timing.loaded_bytes = self.request_stats.loaded_bytes
+            self.timings.append(timing)
+            logger.info("ホール処理時間: %.2f 秒 (%d 行) %s", timing.seconds, timing.rows, hall_url)
+            if timing.blocked:
+                logger.info(
+                    "リクエスト %d 件中 %d 件をブロック / 読み込み %.1f KB",
+                    timing.requests,
+                    timing.blocked,
+                    timing.loaded_bytes / 1024,
+                )
+
+    def log_summary(self) -> None:
+        """ホール別処理時間のサマリーを出力し、CSV に保存する"""
+        log_timing_summary(self.timings, [self.launch_seconds])
+
+
+@dataclass
+class BrowserSession(ScrapeSession):
+    """
+    1回の実行につき Chromium を1度だけ起動し、ホールごとに新しい context/page を渡す。
+    with 文で使用し、抜けるときにブラウザと Playwright を確実に閉じる。
+    """
+
+    backend = "playwright"
+
+    headless: bool = True
+    _playwright: Playwright | None = field(default=None, init=False, repr=False)
+    _browser: Browser | None = field(default=None, init=False, repr=False)
+
+    def __enter__(self) -> "BrowserSession":
+        start = time.perf_counter()
+        try:
+            self._playwright = sync_playwright().start()
+            self._browser = self._playwright.chromium.launch(headless=self.headless)
+        except Exception:
+            # 起動に失敗すると __exit__ は呼ばれないため、起動済みの Playwright をここで止める
+            self.close()
+            raise
+        self.launch_seconds = time.perf_counter() - start
+        logger.info("ブラウザ起動: %.2f 秒", self.launch_seconds)
+        return self
+
+    def close(self) -> None:
+        if self._browser is not None:
+            self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+
+    @contextmanager
+    def new_page(self) -> Iterator[Page]:
+        """ホール単位の context/page を作成し、終了時に context ごと破棄する"""
+        if self._browser is None:
+            raise RuntimeError("BrowserSession が開始されていません。")
+        context = self._browser.new_context()
+        if config.BLOCK_REQUESTS:
+            context.route("**/*", self._route)
+        page = context.new_page()
+        page.on("response", self._on_response)
+        try:
+            yield page
+        finally:
+            context.close()
+
+    def _route(self, route: Route) -> None:
+        """不要なリソース・広告・解析タグのリクエストを中断する"""
+        request = route.request
+        self.request_stats.requests += 1
+        if should_block(request.url, request.resource_type):
+            self.request_stats.blocked += 1
+            route.abort()
+        else:
+            route.continue_()
+
+    def _on_response(self, response: Response) -> None:
+        """読み込んだ量を Content-Length から集計する（ない場合は数えない）"""
+        if not config.BLOCK_REQUESTS:
+            self.request_stats.requests += 1
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            self.request_stats.loaded_bytes += int(length)
+
+
+class LazyBrowserSession:
+    """
+    http バックエンドの取り直し用に、最初に必要になったときだけ BrowserSession を起動し、以降は使い回す。
+    Playwright はスレッドをまたげないため、ワーカー（スレッド）ごとに1つ作って with 文で使用する。
+    """
+
+    def __init__(self) -> None:
+        self._session: BrowserSession | None = None
+
+    def __enter__(self) -> "LazyBrowserSession":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def get(self) -> BrowserSession:
+        if self._session is None:
+            session = BrowserSession()
+            try:
+                session.__enter__()
+            except Exception:
+                session.close()
+                raise
+            self._session = session
+        return self._session
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+def log_timing_summary(timings: list[HallTiming], launch_seconds: list[float]) -> None:
+    """
+    ホール別処理時間のサマリーを出力し、CSV に保存する
+    launch_seconds: 起動したブラウザごとの起動時間（並列実行時は複数）
+    """
+    if not timings:
+        return
+    total = sum(t.seconds for t in timings)
+    logger.info(
+        "ブラウザ起動 %d 回 (%.2f 秒) / %d ホール / ホール処理合計 %.2f 秒 (平均 %.2f 秒)",
+        len(launch_seconds),
+        sum(launch_seconds),
+        len(timings),
+        total,
+        total / len(timings),
+    )
+    requests = sum(t.requests for t in timings)
+    blocked = sum(t.blocked for t in timings)
+    if requests:
+        logger.info(
+            "リクエスト合計 %d 件 / ブロック %d 件 (%.0f%%) / 読み込み %.1f MB",
+            requests,
+            blocked,
+            blocked / requests * 100,
+            sum(t.loaded_bytes for t in timings) / 1024 / 1024,
+        )
+    # ホールごとに起動していた場合との差分（平均起動時間 × (ホール数 - 起動回数)）
+    if launch_seconds:
+        avg_launch = sum(launch_seconds) / len(launch_seconds)
+        saved = avg_launch * max(len(timings) - len(launch_seconds), 0)
+        logger.info("ブラウザ再起動の削減見込み: %.2f 秒", saved)
+
+    df = pd.DataFrame([asdict(t) for t in timings])
+    df.to_csv(config.CSV_DIR / "hall_timings.csv", index=False)
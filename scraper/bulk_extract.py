@@ -0,0 +1,41 @@
+from playwright.sync_api import Page
+
+from utils.utils import _norm_text
+
+# =========================
+# ページ内一括抽出
+# =========================
+# locator.nth(i).inner_text() を要素ごとに呼ぶとブラウザとの往復が要素数だけ発生するため、
+# evaluate 1回でまとめて取り出す
+_TEXTS_JS = "els => els.map(e => e.innerText)"
+_LINKS_JS = "els => els.map(a => [a.innerText, a.getAttribute('href')])"
+_ROWS_JS = """rows => rows.map(r => [
+    Array.from(r.querySelectorAll('th'), e => e.innerText),
+    Array.from(r.querySelectorAll('td'), e => e.innerText),
+])"""
+
+
+def extract_texts(page: Page, css: str) -> list[str]:
+    """css に一致する全要素の innerText を返す"""
+    return [_norm_text(t) for t in page.eval_on_selector_all(css, _TEXTS_JS)]
+
+
+def extract_links(page: Page, css: str) -> list[tuple[str, str]]:
+    """css に一致する全リンクの (テキスト, href) を返す"""
+    return [
+        (_norm_text(text), href or "")
+        for text, href in page.eval_on_selector_all(css, _LINKS_JS)
+    ]
+
+
+def extract_table(page: Page, css: str) -> tuple[list[str], list[list[str]]]:
+    """
+    css に一致する tr 群から、先頭行の th をヘッダー、td を持つ行をデータとして返す
+    returns: (header, table)
+    """
+    rows = page.eval_on_selector_all(css, _ROWS_JS)
+    if not rows:
+        return [], []
+    header = [_norm_text(t) for t in rows[0][0]]
+    table = [[_norm_text(t) for t in tds] for _, tds in rows if tds]
+    return header, table
@@ -0,0 +1,114 @@
+import datetime as dt
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import unquote
+
+import pandas as pd
+
+from config import config
+from utils.logger_setup import setup_logger
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+HALL_DONE = "_done"
+
+
+# =========================
+# チェックポイント
+# =========================
+class CheckpointStore:
+    """
+    ホール・日付ごとの取得結果を、取得し終えた時点で CSV に保存する。
+    保存先: data/checkpoints/<run_id>/<ホール>/<YYYY-MM-DD>.csv
+    途中で落ちた場合は resume() で同じ run_id から続きを取得し、
+    最後に load_all() で全チェックポイントから結果を組み立てる。
+    """
+
+    def __init__(self, run_dir: Path):
+        self.run_dir = Path(run_dir)
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def new_run(cls) -> "CheckpointStore":
+        """新しい run_id で保存先を作成し、古い実行分は保持数を超えたら削除する"""
+        run_id = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+        store = cls(config.CHECKPOINT_DIR / run_id)
+        runs = sorted(p for p in config.CHECKPOINT_DIR.iterdir() if p.is_dir())
+        for old in runs[: -config.CHECKPOINT_KEEP_RUNS]:
+            shutil.rmtree(old, ignore_errors=True)
+        logger.info("チェックポイント: %s", store.run_dir)
+        return store
+
+    @classmethod
+    def resume(cls) -> "CheckpointStore":
+        """直近の実行の保存先を返す（なければ新規作成）"""
+        runs = sorted(p for p in config.CHECKPOINT_DIR.iterdir() if p.is_dir())
+        if not runs:
+            logger.warning("再開できるチェックポイントがありません。新規に実行します。")
+            return cls.new_run()
+        logger.info("チェックポイントから再開します: %s", runs[-1])
+        return cls(runs[-1])
+
+    def _hall_dir(self, hall_url: str) -> Path:
+        return self.run_dir / unquote(hall_url.rstrip("/").rsplit("/", 1)[-1])
+
+    def is_done(self, hall_url: str, date: str) -> bool:
+        return (self._hall_dir(hall_url) / f"{date}.csv").exists()
+
+    def is_hall_done(self, hall_url: str) -> bool:
+        return (self._hall_dir(hall_url) / HALL_DONE).exists()
+
+    def save(self, hall_url: str, date: str, frames: list[pd.DataFrame]) -> None:
+        """ホール・日付単位の結果を保存する（一時ファイルに書いてから置き換える）"""
+        hall_dir = self._hall_dir(hall_url)
+        hall_dir.mkdir(parents=True, exist_ok=True)
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        path = hall_dir / f"{date}.csv"
+        tmp = path.with_suffix(".tmp")
+        with self._lock:
+            df.to_csv(tmp, index=False)
+            os.replace(tmp, path)
+        logger.debug("チェックポイント保存: %s (%d 行)", path, len(df))
+
+    def mark_hall_done(self, hall_url: str) -> None:
+        hall_dir = self._hall_dir(hall_url)
+        hall_dir.mkdir(parents=True, exist_ok=True)
+        (hall_dir / HALL_DONE).touch()
+
+    @staticmethod
+    def _read_hall_dir(hall_dir: Path) -> pd.DataFrame:
+        frames = [
+            pd.read_csv(path, dtype=str)
+            for path in sorted(hall_dir.glob("*.csv"))
+            # 機種データのない日は空ファイルとして保存している
+            if path.stat().st_size > 1
+        ]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def load_hall(self, hall_url: str) -> pd.DataFrame:
+        """1ホール分の保存済みチェックポイントをまとめて返す（なければ空の DataFrame）"""
+        hall_dir = self._hall_dir(hall_url)
+        if not hall_dir.is_dir():
+            return pd.DataFrame()
+        return self._read_hall_dir(hall_dir)
+
+    def iter_halls(self) -> Iterator[pd.DataFrame]:
+        """保存済みのチェックポイントをホール単位でまとめて返す（データのないホールは除く）"""
+        for hall_dir in sorted(p for p in self.run_dir.iterdir() if p.is_dir()):
+            df = self._read_hall_dir(hall_dir)
+            if not df.empty:
+                yield df
+
+    def load_all(self) -> pd.DataFrame:
+        """保存済みの全チェックポイントを1つの DataFrame にまとめる"""
+        frames = list(self.iter_halls())
+        logger.info("チェックポイント読み込み: %d ホール", len(frames))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
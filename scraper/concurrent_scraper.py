@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+from urllib.parse import urlparse
+import os
+import queue
+import threading
+
+from config import config
+from utils.logger_setup import setup_logger
+from scraper.browser_session import HallTiming, LazyBrowserSession, log_timing_summary
+from scraper.backends import open_session
+from scraper.scraping_result_data import ScrapedHall, hall_url_of, scrape_hall
+from scraper.manifest import ScrapeManifest
+from scraper.checkpoint import CheckpointStore
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# 並列実行
+# =========================
+def iter_halls_concurrently(
+    hall_list: list[config.HallInfo],
+    workers: int = config.SCRAPE_WORKERS,
+    per_host_limit: int = config.SCRAPE_PER_HOST_LIMIT,
+    manifest: ScrapeManifest | None = None,
+    checkpoint: CheckpointStore | None = None,
+) -> Iterator[tuple[int, ScrapedHall]]:
+    """
+    ホールを workers 本のスレッドで並列に取得し、取得し終えた順に (index, ScrapedHall) を返す。
+    Playwright の sync API はスレッドをまたいで使えないため、
+    各ワーカーが自分のスレッド内でセッション (BrowserSession など) を1つ開き、キューからホールを取り出して処理する。
+    同一ホストへの同時アクセスは per_host_limit までに制限する。
+    受け取り側が遅い場合は、結果キュー (最大 workers 件) が空くまでワーカーが待つ。
+    """
+    n = len(hall_list)
+    workers = max(1, min(workers, n))
+    logger.info("並列取得: %d ホール / ワーカー %d / ホストあたり上限 %d", n, workers, per_host_limit)
+
+    tasks: queue.Queue = queue.Queue()
+    for i, h in enumerate(hall_list):
+        tasks.put((i, h))
+    done: queue.Queue = queue.Queue(maxsize=workers)
+    stop = threading.Event()
+
+    host_limits: dict[str, threading.BoundedSemaphore] = {}
+    host_lock = threading.Lock()
+
+    def host_semaphore(url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with host_lock:
+            if host not in host_limits:
+                host_limits[host] = threading.BoundedSemaphore(per_host_limit)
+            return host_limits[host]
+
+    timings: list[HallTiming] = []
+    launch_seconds: list[float] = []
+    stats_lock = threading.Lock()
+
+    def worker() -> None:
+        try:
+            with open_session() as session, LazyBrowserSession() as fallback:
+                while not stop.is_set():
+                    try:
+                        i, h = tasks.get_nowait()
+                    except queue.Empty:
+                        break
+                    with host_semaphore(hall_url_of(h)):
+                        scraped = scrape_hall(
+                            session, h, i + 1, n, manifest, checkpoint, fallback
+                        )
+                    done.put((i, scraped))
+                with stats_lock:
+                    timings.extend(session.timings)
+                    launch_seconds.append(session.launch_seconds)
+        finally:
+            done.put(None)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scraper") as pool:
+        futures = [pool.submit(worker) for _ in range(workers)]
+        finished = 0
+        try:
+            while finished < workers:
+                item = done.get()
+                if item is None:
+                    finished += 1
+                    continue
+                yield item
+        finally:
+            # 受け取り側が途中で止まった場合も、ワーカーが put で止まらないよう読み捨てる
+            stop.set()
+            while finished < workers:
+                if done.get() is None:
+                    finished += 1
+        for f in futures:
+            f.result()
+
+    log_timing_summary(timings, launch_seconds)
@@ -1,9 +1,14 @@
 import os
+import threading
+
 import pandas as pd
 from supabase import create_client, Client
 
 from config import config
 from utils.logger_setup import setup_logger
+from scraper.upload_engine import upsert_batches
+from scraper.master_cache import MasterCache, get_master_cache
+from scraper.result_hashes import ResultHashStore, get_result_hash_store
 # from app.data_from_supabase import get_supabase_client
 
 # =========================
@@ -24,131 +29,246 @@ def get_supabase_client() -> Client:
     return create_client(url, key)
 
 
-def add_model(df: pd.DataFrame, supabase: Client) -> None:
+def add_model(
+    df: pd.DataFrame, supabase: Client, cache: MasterCache | None = None
+) -> None:
     """--- モデルの登録 (models) ---"""
     models = df["model"].dropna().unique().tolist()
     if not models:
         logger.warning("モデルなし")
         return
 
-    # UNIQUE(models.name) 前提で upsert
-    rows = [{"name": m} for m in models]
-    supabase.table("models").upsert(rows, on_conflict="name").execute()
-    logger.info(f"モデル upsert: {len(rows)} 件（新規/既存含む）")
+    # キャッシュにない名前だけを UNIQUE(models.name) 前提で upsert
+    cache = cache or get_master_cache()
+    with cache.lock:
+        rows = [{"name": m} for m in models if m not in cache.models]
+        if rows:
+            res = supabase.table("models").upsert(rows, on_conflict="name").execute()
+            cache.update_models(res.data)
+            cache.save()
+    logger.info(f"モデル upsert: {len(rows)} 件（キャッシュ済み {len(models) - len(rows)} 件）")
 
 
-def add_prefecture_and_hall(df: pd.DataFrame, supabase: Client) -> None:
+def add_prefecture_and_hall(
+    df: pd.DataFrame, supabase: Client, cache: MasterCache | None = None
+) -> None:
     """--- 都道府県(prefectures) と ホール(halls) 登録 ---"""
     prefectures = df["pref"].dropna().unique().tolist()
     if not prefectures:
         logger.warning("pref カラムが空です。")
         return
 
-    # 1) prefectures upsert
-    pref_rows = [{"name": p} for p in prefectures]
-    supabase.table("prefectures").upsert(pref_rows, on_conflict="name").execute()
-    logger.info(f"都道府県 upsert: {len(pref_rows)} 件（新規/既存含む）")
-
-    # 2) prefecture_id を取得してマップ化
-    pref_res = supabase.table("prefectures").select("prefecture_id, name").execute()
-    pref_map = {row["name"]: row["prefecture_id"] for row in pref_res.data}
-
-    # 3) halls upsert（name + prefecture_id をユニークキー想定）
-    hall_rows = []
-    for pref in prefectures:
-        pid = pref_map.get(pref)
-        if not pid:
-            logger.warning(f"⚠ prefecture_id 取得失敗: {pref}")
-            continue
-        halls = df.loc[df["pref"] == pref, "hall"].dropna().unique().tolist()
-        for hall in halls:
-            hall_rows.append({"name": hall, "prefecture_id": pid})
-
-    if hall_rows:
-        supabase.table("halls").upsert(
-            hall_rows,
-            on_conflict="name,prefecture_id",
-        ).execute()
-        logger.info(f"ホール upsert: {len(hall_rows)} 件（新規/既存含む）")
-    else:
-        logger.warning("ホールなし")
-
-
-def add_data_result(df: pd.DataFrame, supabase: Client) -> None:
-    """--- results テーブルへデータ登録 ---"""
+    cache = cache or get_master_cache()
+    with cache.lock:
+        # 1) prefectures upsert（キャッシュにないものだけ）
+        pref_rows = [{"name": p} for p in prefectures if p not in cache.prefectures]
+        if pref_rows:
+            res = supabase.table("prefectures").upsert(pref_rows, on_conflict="name").execute()
+            # 2) 返却行の prefecture_id でマップを更新
+            cache.update_prefectures(res.data)
+        logger.info(
+            f"都道府県 upsert: {len(pref_rows)} 件"
+            f"（キャッシュ済み {len(prefectures) - len(pref_rows)} 件）"
+        )
 
-    # 1) 最新の prefectures / halls / models を取得して ID マップを作る
-    pref_res = supabase.table("prefectures").select("prefecture_id, name").execute()
-    hall_res = supabase.table("halls").select("hall_id, name, prefecture_id").execute()
-    model_res = supabase.table("models").select("model_id, name").execute()
+        # 3) halls upsert（name + prefecture_id をユニークキー想定）
+        hall_rows = []
+        cached = 0
+        for pref in prefectures:
+            pid = cache.prefectures.get(pref)
+            if not pid:
+                logger.warning(f"⚠ prefecture_id 取得失敗: {pref}")
+                continue
+            halls = df.loc[df["pref"] == pref, "hall"].dropna().unique().tolist()
+            for hall in halls:
+                if (pid, hall) in cache.halls:
+                    cached += 1
+                    continue
+                hall_rows.append({"name": hall, "prefecture_id": pid})
+
+        if hall_rows:
+            res = supabase.table("halls").upsert(
+                hall_rows,
+                on_conflict="name,prefecture_id",
+            ).execute()
+            cache.update_halls(res.data)
+            logger.info(f"ホール upsert: {len(hall_rows)} 件（キャッシュ済み {cached} 件）")
+        elif cached:
+            logger.info(f"ホール upsert: 0 件（キャッシュ済み {cached} 件）")
+        else:
+            logger.warning("ホールなし")
+        cache.save()
+
+
+RESULT_INT_COLUMNS = ["unit_no", "game", "bb", "rb", "medal"]
+
+
+RESULT_COLUMNS = ["hall_id", "model_id", "unit_no", "date", "game", "bb", "rb", "medal"]
+
+
+def build_result_records(
+    df: pd.DataFrame,
+    pref_map: dict[str, int],
+    hall_map: dict[tuple[int, str], int],
+    model_map: dict[str, int],
+) -> tuple[list[dict], pd.DataFrame]:
+    """
+    pref/hall/model を ID に置き換え、数値列を整数にした results 用レコードを作る。
+    returns: (records, rejected)  rejected は変換できなかった行と理由（reason 列）
+    """
+    frame, rejected = build_result_frame(df, pref_map, hall_map, model_map)
+    return frame.to_dict("records"), rejected
+
+
+def build_result_frame(
+    df: pd.DataFrame,
+    pref_map: dict[str, int],
+    hall_map: dict[tuple[int, str], int],
+    model_map: dict[str, int],
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    build_result_records の DataFrame 版（列は RESULT_COLUMNS の順）。
+    行ごとのループではなく、列単位の map / merge でまとめて変換する。
+    """
+    work = df[["pref", "hall", "model", "date", *RESULT_INT_COLUMNS]].copy()
+
+    # 名前 → ID（カテゴリ型にして、ユニークな値だけを map する）
+    work["prefecture_id"] = work["pref"].astype("category").map(pref_map).astype("Int64")
+    work["model_id"] = work["model"].astype("category").map(model_map).astype("Int64")
+    halls = pd.DataFrame(
+        [(pid, name, hid) for (pid, name), hid in hall_map.items()],
+        columns=["prefecture_id", "hall", "hall_id"],
+    ).astype({"prefecture_id": "Int64", "hall_id": "Int64"})
+    work = work.merge(halls, on=["prefecture_id", "hall"], how="left")
+
+    # 数値列をまとめて変換（変換できない値は NaN）
+    nums = work[RESULT_INT_COLUMNS].apply(pd.to_numeric, errors="coerce")
+
+    # 理由は従来の判定順（都道府県 → ホール → 機種 → 数値）で1つだけ付ける
+    reason = pd.Series(pd.NA, index=work.index, dtype="string")
+    checks = [
+        (work["prefecture_id"].isna(), "prefecture_id なし"),
+        (work["hall_id"].isna(), "hall_id なし"),
+        (work["model_id"].isna(), "model_id なし"),
+        (nums.isna().any(axis=1), "数値変換エラー"),
+    ]
+    for mask, label in checks:
+        reason = reason.mask(mask & reason.isna(), label)
+    bad = reason.notna()
+
+    rejected = df.loc[bad.to_numpy()].assign(reason=reason[bad].to_numpy())
+
+    ok = work.loc[~bad, ["hall_id", "model_id"]].astype("int64")
+    ok[RESULT_INT_COLUMNS] = nums.loc[~bad].astype("int64")
+    ok["date"] = work.loc[~bad, "date"].astype(str)  # 'YYYY-MM-DD' 文字列でOK
+
+    return ok[RESULT_COLUMNS], rejected
+
+
+# rejected_results.csv をこの実行で書き始めたか（ホールごとに呼ばれるため、2回目以降は追記する）
+_rejected_lock = threading.Lock()
+_rejected_started = False
+
+
+def report_rejected(rejected: pd.DataFrame) -> None:
+    """
+    変換できなかった行を1つの CSV にまとめ、理由ごとの件数だけをログに出す。
+    実行中の最初の呼び出しで作り直し（ヘッダーあり）、以降は同じファイルに追記する
+    """
+    global _rejected_started
+    if rejected.empty:
+        return
+    path = config.CSV_DIR / "rejected_results.csv"
+    with _rejected_lock:
+        rejected.to_csv(
+            path,
+            mode="a" if _rejected_started else "w",
+            header=not _rejected_started,
+            index=False,
+        )
+        _rejected_started = True
+    counts = rejected["reason"].value_counts().to_dict()
+    logger.warning(f"⚠ results に登録できない行: {len(rejected)} 件 {counts} -> {path}")
+
+
+def _missing_in_cache(df: pd.DataFrame, cache: MasterCache) -> bool:
+    """df の pref / hall / model のうち、キャッシュにないものがあるか"""
+    if not set(df["pref"].dropna()) <= cache.prefectures.keys():
+        return True
+    if not set(df["model"].dropna()) <= cache.models.keys():
+        return True
+    pairs = df[["pref", "hall"]].dropna().drop_duplicates()
+    return any(
+        (cache.prefectures[p], h) not in cache.halls for p, h in pairs.itertuples(index=False)
+    )
+
+
+def add_data_result(
+    df: pd.DataFrame,
+    supabase: Client,
+    cache: MasterCache | None = None,
+    hashes: ResultHashStore | None = None,
+) -> None:
+    """--- results テーブルへデータ登録 ---"""
 
-    pref_map = {p["name"]: p["prefecture_id"] for p in pref_res.data}
-    # (pref, hall) -> hall_id
-    hall_map = {(h["prefecture_id"], h["name"]): h["hall_id"] for h in hall_res.data}
-    model_map = {m["name"]: m["model_id"] for m in model_res.data}
+    # 1) prefectures / halls / models の ID マップはキャッシュを使う
+    #    キャッシュにない名前があるときだけ全件を取り直す
+    cache = cache or get_master_cache()
+    with cache.lock:
+        if _missing_in_cache(df, cache):
+            cache.refresh(supabase)
+        pref_map = dict(cache.prefectures)
+        # (pref, hall) -> hall_id
+        hall_map = dict(cache.halls)
+        model_map = dict(cache.models)
 
     # 2) DataFrame から results 用レコードを作成
-    records = []
-    for _, row in df.iterrows():
-        pref = row["pref"]
-        hall_name = row["hall"]
-        model_name = row["model"]
-
-        pid = pref_map.get(pref)
-        if not pid:
-            logger.warning(f"⚠ prefecture_id なし: {pref}")
-            continue
-
-        hall_id = hall_map.get((pid, hall_name))
-        if not hall_id:
-            logger.warning(f"⚠ hall_id なし: {pref} / {hall_name}")
-            continue
-
-        model_id = model_map.get(model_name)
-        if not model_id:
-            logger.warning(f"⚠ model_id なし: {model_name}")
-            continue
-
-        try:
-            unit_no = int(row["unit_no"])
-            game = int(row["game"])
-            bb = int(row["bb"])
-            rb = int(row["rb"])
-            medal = int(row["medal"])
-        except (TypeError, ValueError):
-            logger.warning(f"⚠ 数値変換エラー: {row}")
-            continue
-
-        records.append(
-            {
-                "hall_id": hall_id,
-                "model_id": model_id,
-                "unit_no": unit_no,
-                "date": str(row["date"]),  # 'YYYY-MM-DD' 文字列でOK
-                "game": game,
-                "bb": bb,
-                "rb": rb,
-                "medal": medal,
-            }
-        )
+    records, rejected = build_result_records(df, pref_map, hall_map, model_map)
+    report_rejected(rejected)
 
     if not records:
         logger.warning("results に挿入するデータがありません。")
         return
 
-    # 3) 一括 upsert（unique(hall_id, model_id, unit_no, date) を想定）
-    #    行数が多い場合はバッチに分ける
-    batch_size = 1000
-    inserted = 0
-    for i in range(0, len(records), batch_size):
-        batch = records[i : i + batch_size]
-        supabase.table("results").upsert(
-            batch,
-            on_conflict="hall_id,model_id,unit_no,date",
-        ).execute()
-        inserted += len(batch)
-
-    logger.info(f"results upsert: {inserted} 件（新規/既存含む）")
+    # 3) 前回送信時と内容が同じ行は送らない（新規・変更のあった行だけ）
+    hashes = hashes or get_result_hash_store()
+    records, sent_keys = hashes.diff(records)
+    if not records:
+        return
+
+    # 4) 一括 upsert（unique(hall_id, model_id, unit_no, date) を想定）
+    #    バッチに分けて並列送信し、失敗したバッチは再送 → デッドレターへ
+    result = upsert_batches(
+        supabase,
+        "results",
+        records,
+        on_conflict="hall_id,model_id,unit_no,date",
+    )
+
+    logger.info(f"results upsert: {result.sent} 件（新規/既存含む）")
+    if result.failed:
+        # 一部でも失敗したらハッシュは記録せず、次回すべて送り直す。
+        # 失敗したバッチはデッドレターとして次回の実行で再送するため、ここではエラーにしない
+        # （ジョブを失敗させると data/state のキャッシュが保存されず、デッドレターも残らない）
+        logger.error(
+            f"⚠ results upsert 失敗: {result.failed} 件 -> {result.dead_letter}（次回再送）"
+        )
+        return
+    hashes.commit(sent_keys)
+
+
+def refresh_current_units(supabase: Client) -> None:
+    """
+    --- 設置中の台（current_units）の更新 ---
+    sql/03_current_units.sql の refresh_current_units() を呼ぶ。
+    更新できなくてもアップロード済みのデータには影響しないため、警告だけ出して続ける
+    """
+    try:
+        res = supabase.rpc("refresh_current_units", {}).execute()
+    except Exception as e:
+        logger.warning(f"current_units の更新に失敗しました: {e}")
+        return
+    logger.info(f"current_units 更新: {res.data} 台")
 
 
 if __name__ == "__main__":
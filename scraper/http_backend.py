@@ -0,0 +1,181 @@
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+from urllib.parse import urljoin
+import os
+import time
+
+import httpx
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from config import config
+from utils.logger_setup import setup_logger
+from utils.utils import _norm_text
+from scraper.browser_session import ScrapeSession
+from scraper.scraping_hall_page import build_date_urls
+from scraper.scraping_date_page import build_model_urls
+from scraper.scraping_model_page import build_model_frame, pick_model_name
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+    ),
+    "Accept-Language": "ja,en;q=0.8",
+}
+
+
+# =========================
+# HTTP セッション
+# =========================
+class HttpPage:
+    """Playwright の Page の代わりに渡す、HTTP で取得した直近ページの保持役"""
+
+    def __init__(self, client: httpx.Client):
+        self.client = client
+        self.url = ""
+        self.soup = BeautifulSoup("", "html.parser")
+
+    def goto(self, url: str) -> BeautifulSoup:
+        res = self.client.get(url)
+        res.raise_for_status()
+        self.url = str(res.url)
+        self.soup = BeautifulSoup(res.text, "html.parser")
+        return self.soup
+
+
+@dataclass
+class HttpSession(ScrapeSession):
+    """
+    ブラウザを使わずに、コネクションを使い回す HTTP クライアントでページを取得する。
+    サーバー側でレンダリング済みのページのみ対象（JS 実行が必要なページは Playwright を使う）
+    """
+
+    backend = "http"
+
+    max_connections: int = 10
+    _client: httpx.Client | None = field(default=None, init=False, repr=False)
+
+    def __enter__(self) -> "HttpSession":
+        start = time.perf_counter()
+        self._client = httpx.Client(
+            headers=HEADERS,
+            timeout=httpx.Timeout(90.0, connect=15.0),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            follow_redirects=True,
+        )
+        self.launch_seconds = time.perf_counter() - start
+        return self
+
+    def close(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    @contextmanager
+    def new_page(self) -> Iterator[HttpPage]:
+        if self._client is None:
+            raise RuntimeError("HttpSession が開始されていません。")
+        yield HttpPage(self._client)
+
+
+# =========================
+# HTML 解析（ネットワーク不要）
+# =========================
+def _select_links(soup: BeautifulSoup, css: str) -> list[tuple[str, str]]:
+    return [(_norm_text(a.get_text()), a.get("href") or "") for a in soup.select(css)]
+
+
+def parse_hall_page(soup: BeautifulSoup) -> tuple[str, str, list[tuple[str, str]]]:
+    """ホールページから (県名, ホール名, 日付リンク) を取り出す"""
+    h1 = soup.select_one("#content h1")
+    todofuken = soup.select_one("#content div span.todofuken")
+    hall = _norm_text(h1.get_text() if h1 else None)
+    pref = _norm_text(todofuken.get_text() if todofuken else None)
+    # html.parser は tbody を補わないため tbody を省いたセレクタで探す
+    links = _select_links(soup, "#content div table tr td a")
+    return pref, hall, links
+
+
+def parse_date_page(soup: BeautifulSoup) -> list[tuple[str, str]]:
+    """日付ページから機種リンクを取り出す"""
+    return _select_links(soup, "table.kishu tr td a")
+
+
+def parse_model_page(soup: BeautifulSoup) -> tuple[str, list[str], list[list[str]]]:
+    """機種ページから (機種名, ヘッダー, 台データ行) を取り出す"""
+    model = pick_model_name([h2.get_text() for h2 in soup.select("div.tab_content > h2")])
+    rows = soup.select("div > div.table_wrap > table tr")
+    if not rows:
+        return model, [], []
+    header = [_norm_text(th.get_text()) for th in rows[0].select("th")]
+    table = [[_norm_text(td.get_text()) for td in r.select("td")] for r in rows]
+    return model, header, [row for row in table if row]
+
+
+# =========================
+# ページ操作（Playwright 版と同じシグネチャ）
+# =========================
+def extract_date_url(hall_url, page: HttpPage, period) -> list[tuple[str, str, str, str]]:
+    """
+    ホールのメインページから、直近 period 件の日付リンクを取得
+    returns: List[(prefecture, hall, date(YYYY-MM-DD), date_url)]
+    """
+    logger.info(f"ホールのトップページにアクセスします。(http)")
+    logger.info(f"url: {hall_url}")
+    pref, hall, links = parse_hall_page(page.goto(hall_url))
+    logger.info("Hall: %s / Pref: %s", hall, pref)
+    if not links:
+        # JS で描画されるページの可能性があるため、エラーにして Playwright に任せる
+        raise RuntimeError(f"日付リンクが見つかりません (http): {hall_url}")
+    return build_date_urls(pref, hall, links, period)
+
+
+def extract_model_url(
+    page: HttpPage, hall: str, pref: str, date_url: str, date: str
+) -> list[tuple[str, str, str, str, str]]:
+    """
+    日付ページから、"ジャグラー" を含む機種リンクを抽出
+    returns: List[(pref, hall, date, date_url, model_url)]
+    """
+    logger.info("日付ページにアクセス: %s (http)", date_url)
+    links = parse_date_page(page.goto(date_url))
+    if not links:
+        logger.warning("機種リンクが見つかりません: %s", date_url)
+        return []
+    return build_model_urls(pref, hall, date, date_url, links)
+
+
+def extract_model_data(
+    page: HttpPage, model_urls: list[tuple[str, str, str, str, str]]
+) -> pd.DataFrame:
+    """
+    各機種ページを取得し、台データを DataFrame で返す
+    返却列: 台番/G数/差枚/BB/RB + pref/hall/model/date
+    """
+    frames: list[pd.DataFrame] = []
+
+    for pref, hall, date, date_url, model_url in model_urls:
+        url = urljoin(date_url, model_url)
+        logger.info(f"機種ページにアクセスします。(http)")
+        logger.info(f"{url}")
+        model, header, table = parse_model_page(page.goto(url))
+        if not table:
+            # Playwright 版の page.reload() に相当（初回アクセスで Cookie が付与される場合）
+            model, header, table = parse_model_page(page.goto(url))
+        if not table:
+            raise RuntimeError(f"テーブルが見つかりません (http): {url}")
+        logger.info(f"機種名: {model}")
+        frames.append(build_model_frame(header, table, pref, hall, model, date))
+
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
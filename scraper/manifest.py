@@ -0,0 +1,81 @@
+import datetime as dt
+import os
+import threading
+
+import pandas as pd
+
+from config import config
+from utils.logger_setup import setup_logger
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+COLUMNS = ["hall", "date", "model_url", "scraped_at"]
+
+
+# =========================
+# 取得済みページの記録
+# =========================
+class ScrapeManifest:
+    """
+    取得済みの (hall, date, model_url) を CSV に記録し、次回以降の実行でスキップする。
+    1日2回の実行で、2回目は新しいページだけを取得するために使う。
+    force=True の場合は記録を参照せずにすべて取得する（記録の更新は行う）。
+    """
+
+    def __init__(self, path=config.MANIFEST_PATH, force: bool = False):
+        self.path = path
+        self.force = force
+        self._lock = threading.Lock()
+        self._done: set[tuple[str, str, str]] = set()
+        self.skipped = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        df = pd.read_csv(self.path, dtype=str)
+        # 保持期間を過ぎた記録は読み込まない
+        cutoff = dt.date.today() - dt.timedelta(days=config.MANIFEST_KEEP_DAYS)
+        df = df[df["date"] >= cutoff.strftime("%Y-%m-%d")]
+        self._done = set(zip(df["hall"], df["date"], df["model_url"]))
+        logger.info("取得済みページ: %d 件 (%s)", len(self._done), self.path)
+        # 期限切れの行を落として書き直す
+        df[COLUMNS].to_csv(self.path, index=False)
+
+    def is_done(self, hall: str, date: str, model_url: str) -> bool:
+        if self.force:
+            return False
+        with self._lock:
+            return (hall, date, model_url) in self._done
+
+    def filter_new(
+        self, model_urls: list[tuple[str, str, str, str, str]]
+    ) -> list[tuple[str, str, str, str, str]]:
+        """model_urls のうち未取得のものだけを返す"""
+        new = [m for m in model_urls if not self.is_done(m[1], m[2], m[4])]
+        skipped = len(model_urls) - len(new)
+        if skipped:
+            with self._lock:
+                self.skipped += skipped
+            logger.info("取得済みのためスキップ: %d 件", skipped)
+        return new
+
+    def mark_done(self, hall: str, date: str, model_url: str) -> None:
+        """取得完了を記録する（途中で止まっても残るよう、その場で追記する）"""
+        self.mark_done_many([(hall, date, model_url)])
+
+    def mark_done_many(self, pages: list[tuple[str, str, str]]) -> None:
+        """(hall, date, model_url) をまとめて記録する（アップロードが済んだホールの分を1回で追記する）"""
+        if not pages:
+            return
+        now = dt.datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            self._done.update(pages)
+            write_header = not os.path.exists(self.path)
+            pd.DataFrame([[*p, now] for p in pages], columns=COLUMNS).to_csv(
+                self.path, mode="a", header=write_header, index=False
+            )
@@ -0,0 +1,104 @@
+import datetime as dt
+import json
+import os
+import threading
+
+from config import config
+from utils.logger_setup import setup_logger
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+# 保存形式を変えたら上げる（古い形式のキャッシュは読み捨てる）
+CACHE_VERSION = 1
+
+
+# =========================
+# マスタ ID キャッシュ
+# =========================
+class MasterCache:
+    """
+    prefectures / halls / models の name → ID をローカルの JSON に保存して使い回す。
+    upsert の返却行（returning）で更新し、次回以降は新しい名前だけを送る。
+    保存から MASTER_CACHE_TTL_DAYS を過ぎたキャッシュは使わず、全件を取り直す。
+    """
+
+    def __init__(self, path=config.MASTER_CACHE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.prefectures: dict[str, int] = {}
+        self.halls: dict[tuple[int, str], int] = {}
+        self.models: dict[str, int] = {}
+        self.updated_at: str | None = None
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CACHE_VERSION:
+            logger.info("マスタキャッシュの形式が古いため破棄します。")
+            return
+        updated_at = dt.datetime.fromisoformat(data["updated_at"])
+        if dt.datetime.now() - updated_at > dt.timedelta(days=config.MASTER_CACHE_TTL_DAYS):
+            logger.info("マスタキャッシュの有効期限切れのため破棄します。")
+            return
+        self.prefectures = data["prefectures"]
+        self.halls = {(pid, name): hid for pid, name, hid in data["halls"]}
+        self.models = data["models"]
+        self.updated_at = data["updated_at"]
+        logger.info(
+            f"マスタキャッシュ読み込み: 都道府県 {len(self.prefectures)} / "
+            f"ホール {len(self.halls)} / モデル {len(self.models)}"
+        )
+
+    def save(self) -> None:
+        self.updated_at = dt.datetime.now().isoformat(timespec="seconds")
+        data = {
+            "version": CACHE_VERSION,
+            "updated_at": self.updated_at,
+            "prefectures": self.prefectures,
+            "halls": [[pid, name, hid] for (pid, name), hid in self.halls.items()],
+            "models": self.models,
+        }
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    # --- upsert / select の返却行で更新 ---
+    def update_prefectures(self, rows: list[dict]) -> None:
+        self.prefectures.update({r["name"]: r["prefecture_id"] for r in rows})
+
+    def update_halls(self, rows: list[dict]) -> None:
+        self.halls.update({(r["prefecture_id"], r["name"]): r["hall_id"] for r in rows})
+
+    def update_models(self, rows: list[dict]) -> None:
+        self.models.update({r["name"]: r["model_id"] for r in rows})
+
+    def refresh(self, supabase) -> None:
+        """3テーブルを全件取得してキャッシュを作り直す"""
+        logger.info("マスタテーブルを全件取得してキャッシュを更新します。")
+        pref_res = supabase.table("prefectures").select("prefecture_id, name").execute()
+        hall_res = supabase.table("halls").select("hall_id, name, prefecture_id").execute()
+        model_res = supabase.table("models").select("model_id, name").execute()
+        self.prefectures, self.halls, self.models = {}, {}, {}
+        self.update_prefectures(pref_res.data)
+        self.update_halls(hall_res.data)
+        self.update_models(model_res.data)
+        self.save()
+
+
+_cache: MasterCache | None = None
+
+
+def get_master_cache() -> MasterCache:
+    """実行中は同じキャッシュを使い回す"""
+    global _cache
+    if _cache is None:
+        _cache = MasterCache()
+    return _cache
@@ -0,0 +1,152 @@
+import os
+import queue
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from config import config
+from utils.logger_setup import setup_logger
+from scraper.preprocess_for_db import df_data_clean
+from scraper import data_to_supabase
+from scraper.upload_engine import retry_dead_letters
+from scraper.manifest import ScrapeManifest
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+_DONE = None
+# キューが一杯のとき、アップロードスレッドが生きているかを確認する間隔（秒）
+_PUT_INTERVAL = 1.0
+
+
+def append_csv(df: pd.DataFrame, path: Path, first: bool) -> None:
+    """first=True のときは上書き（ヘッダーあり）、以降は追記する"""
+    df.to_csv(path, mode="w" if first else "a", header=first, index=False)
+
+
+# =========================
+# 取得 → 前処理 → アップロードのパイプライン
+# =========================
+class UploadPipeline:
+    """
+    ホール単位の DataFrame を受け取り、別スレッドで df_data_clean と Supabase への upsert を行う。
+    スクレイピングとアップロードを並行させ、キューは最大 maxsize 件までに抑える。
+    all_result_data.csv / cleaned_all_result_data.csv はホールごとに追記し、
+    終了時には従来の一括処理と同じファイルができる。
+    manifest を渡した場合は、ホールの処理が済んでから put() で渡された機種ページを記録する
+    （アップロードできなかったホールは次回の実行で取り直す）。
+    """
+
+    def __init__(
+        self,
+        maxsize: int = config.PIPELINE_QUEUE_SIZE,
+        upload: bool = True,
+        manifest: ScrapeManifest | None = None,
+    ):
+        self.upload = upload
+        self.manifest = manifest
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name="uploader", daemon=True)
+        self._first_raw = True
+        self._first_clean = True
+        self.halls = 0
+        self.rows = 0
+        self.errors: list[str] = []
+        self._supabase = None
+        # アップロードスレッドが例外で止まったときの例外
+        self._failure: BaseException | None = None
+
+    def __enter__(self) -> "UploadPipeline":
+        # クライアントの作成と再送は呼び出し側のスレッドで行い、失敗したらここで例外にする
+        if self.upload:
+            self._supabase = data_to_supabase.get_supabase_client()
+            # 前回までに送れなかったバッチを先に再送する
+            retry_dead_letters(self._supabase)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            self._put(_DONE)
+        except RuntimeError:
+            if exc_type is None:
+                raise
+            return
+        self._thread.join()
+        logger.info("パイプライン完了: %d ホール / %d 行", self.halls, self.rows)
+        if exc_type is not None:
+            return
+        # 正常に終わったスレッドも is_alive() は False になるため、ここでは例外の有無だけを見る
+        if self._failure is not None:
+            raise RuntimeError("アップロードスレッドが停止しました") from self._failure
+        if self.errors:
+            raise RuntimeError(f"アップロードに失敗したホールがあります: {self.errors}")
+
+    def put(self, df_hall: pd.DataFrame, pages: list[tuple[str, str, str]] = ()) -> None:
+        """
+        取得済みのホールを渡す（キューが一杯のときは空くまで待つ）
+        pages: このホールの行の元になった (hall, date, model_url)。処理が済んだら manifest に記録する
+        """
+        self._put((df_hall, list(pages)))
+
+    def _put(self, item) -> None:
+        """アップロードスレッドが止まっていたら、待ち続けずに例外にする"""
+        while True:
+            self._check_alive()
+            try:
+                self._queue.put(item, timeout=_PUT_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def _check_alive(self) -> None:
+        if self._failure is not None:
+            raise RuntimeError("アップロードスレッドが停止しました") from self._failure
+        if self._thread.ident is not None and not self._thread.is_alive():
+            raise RuntimeError("アップロードスレッドが停止しました")
+
+    def _run(self) -> None:
+        try:
+            self._consume()
+        except BaseException as e:
+            logger.exception("アップロードスレッドでエラー: %s", e)
+            self._failure = e
+
+    def _consume(self) -> None:
+        supabase = self._supabase
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                break
+            df_hall, pages = item
+            try:
+                self._process(df_hall, supabase)
+            except Exception as e:
+                label = ",".join(map(str, df_hall["hall"].dropna().unique()))
+                logger.exception("ホールのアップロードでエラー: %s %s", label, e)
+                self.errors.append(label)
+                continue
+            if self.manifest is not None:
+                self.manifest.mark_done_many(pages)
+        if supabase is not None and self.halls:
+            # アップロードした日付で「設置中の台」を作り直す
+            data_to_supabase.refresh_current_units(supabase)
+
+    def _process(self, df_hall: pd.DataFrame, supabase) -> None:
+        append_csv(df_hall, config.CSV_DIR / "all_result_data.csv", self._first_raw)
+        self._first_raw = False
+
+        df = df_data_clean(df_hall, save_csv=False)
+        append_csv(df, config.CSV_DIR / "cleaned_all_result_data.csv", self._first_clean)
+        self._first_clean = False
+
+        if supabase is not None:
+            data_to_supabase.add_model(df, supabase)
+            data_to_supabase.add_prefecture_and_hall(df, supabase)
+            data_to_supabase.add_data_result(df, supabase)
+        self.halls += 1
+        self.rows += len(df)
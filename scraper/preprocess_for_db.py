@@ -14,7 +14,8 @@ logger = setup_logger(filename, log_file=config.LOG_PATH)
 # =========================
 # データベースへの前処理
 # =========================
-def df_data_clean(df):
+def df_data_clean(df, save_csv=True):
+    """列名・機種名を統一し、数値列を整数に変換する（save_csv=False で CSV 出力を省略）"""
 
     MODELS_ALIAS_MAP = {
         "SミスタージャグラーKK": "ミスタージャグラー",
@@ -46,9 +47,10 @@ def df_data_clean(df):
     df["game"] = df["game"].str.replace(",", "").astype(int)
     df["medal"] = df["medal"].str.replace(",", "").astype(int)
 
-    df.to_csv(config.CSV_DIR / "cleaned_all_result_data.csv", index=False)
-    logger.debug(df.info())
-    logger.info("データを出力しました。")
+    if save_csv:
+        df.to_csv(config.CSV_DIR / "cleaned_all_result_data.csv", index=False)
+        logger.debug(df.info())
+        logger.info("データを出力しました。")
     
     return df
 
@@ -0,0 +1,100 @@
+import datetime as dt
+import os
+import threading
+
+import pandas as pd
+
+from config import config
+from utils.logger_setup import setup_logger
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+KEY_COLUMNS = ["hall_id", "model_id", "unit_no", "date"]
+VALUE_COLUMNS = ["game", "bb", "rb", "medal"]
+
+
+def content_hash(df: pd.DataFrame) -> pd.Series:
+    """game / bb / rb / medal の内容ハッシュ（行ごと・列単位でまとめて計算）"""
+    return pd.util.hash_pandas_object(df[VALUE_COLUMNS], index=False).astype("uint64")
+
+
+# =========================
+# 送信済み results の内容ハッシュ
+# =========================
+class ResultHashStore:
+    """
+    送信済みの results を自然キー (hall_id, model_id, unit_no, date) → 内容ハッシュで保存し、
+    新規・変更のあった行だけを送るために使う。
+    保存先: data/state/result_hashes.csv（RESULT_HASH_KEEP_DAYS より古い日付は捨てる）
+    """
+
+    def __init__(self, path=config.RESULT_HASH_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.df = pd.DataFrame(columns=[*KEY_COLUMNS, "hash"])
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        df = pd.read_csv(
+            self.path,
+            dtype={"hall_id": "int64", "model_id": "int64", "unit_no": "int64",
+                   "date": str, "hash": "uint64"},
+        )
+        cutoff = dt.date.today() - dt.timedelta(days=config.RESULT_HASH_KEEP_DAYS)
+        self.df = df[df["date"] >= cutoff.strftime("%Y-%m-%d")]
+        logger.info(f"送信済みハッシュ読み込み: {len(self.df)} 件")
+
+    def save(self) -> None:
+        tmp = f"{self.path}.tmp"
+        self.df.to_csv(tmp, index=False)
+        os.replace(tmp, self.path)
+
+    def diff(self, records: list[dict]) -> tuple[list[dict], pd.DataFrame]:
+        """
+        records を新規 / 変更 / 変更なしに分け、新規と変更の行だけを返す
+        returns: (送信する records, 送信する行のキーとハッシュ)
+        """
+        if not records:
+            return [], self.df.iloc[0:0]
+        df = pd.DataFrame(records)
+        df["hash"] = content_hash(df)
+        with self.lock:
+            merged = df.merge(
+                self.df.rename(columns={"hash": "old_hash"}), on=KEY_COLUMNS, how="left"
+            )
+        is_new = merged["old_hash"].isna()
+        is_changed = ~is_new & (merged["hash"] != merged["old_hash"])
+        send = (is_new | is_changed).to_numpy()
+
+        logger.info(
+            f"results 差分: 新規 {int(is_new.sum())} 件 / 更新 {int(is_changed.sum())} 件 / "
+            f"変更なし {int((~send).sum())} 件"
+        )
+        to_send = [r for r, s in zip(records, send) if s]
+        return to_send, df.loc[send, [*KEY_COLUMNS, "hash"]]
+
+    def commit(self, sent: pd.DataFrame) -> None:
+        """送信に成功した行のハッシュを記録して保存する"""
+        if sent.empty:
+            return
+        with self.lock:
+            df = pd.concat([self.df, sent], ignore_index=True)
+            self.df = df.drop_duplicates(subset=KEY_COLUMNS, keep="last")
+            self.save()
+
+
+_store: ResultHashStore | None = None
+
+
+def get_result_hash_store() -> ResultHashStore:
+    """実行中は同じストアを使い回す"""
+    global _store
+    if _store is None:
+        _store = ResultHashStore()
+    return _store
@@ -1,15 +1,19 @@
 import pandas as pd
-from urllib.parse import quote, urljoin
+import argparse
+from typing import Iterator
 import os
 import time
-import os
 import yaml
 
 from config import config
 from utils.logger_setup import setup_logger
-from scraper.scraping_result_data import extract_result_data
-from scraper.preprocess_for_db import df_data_clean
-from scraper import data_to_supabase
+from scraper.scraping_result_data import ScrapedHall, scrape_hall
+from scraper.backends import open_session
+from scraper.browser_session import LazyBrowserSession
+from scraper.concurrent_scraper import iter_halls_concurrently
+from scraper.manifest import ScrapeManifest
+from scraper.checkpoint import CheckpointStore
+from scraper.pipeline import UploadPipeline
 
 # =========================
 # 設定・ロガー
@@ -21,11 +25,8 @@ logger = setup_logger(filename, log_file=config.LOG_PATH)
 # =========================
 # ページ操作
 # =========================
-def scraper_all_hall(test_mode=False) -> pd.DataFrame:
-    start = time.perf_counter()
-
-
-    # yaml  読み込み
+def load_hall_list(test_mode=False) -> list[config.HallInfo]:
+    """halls.yaml を読み込んでホール一覧を返す"""
     if not os.path.exists(config.HALLS_YAML):
         raise FileNotFoundError(f"YAMLが見つかりません: {config.HALLS_YAML}")
     with open(config.HALLS_YAML, "r", encoding="utf-8") as f:
@@ -39,41 +40,101 @@ def scraper_all_hall(test_mode=False) -> pd.DataFrame:
         hall_list = hall_list[:2]
         logger.info("***********現在はテストモードで実行しています。**********")
 
-    frames: list = []
-    for i, h in enumerate(hall_list, start=1):
-        try:
-            encoded_slug = quote(h.slug)
-            hall_url = urljoin(config.MAIN_URL, encoded_slug)
-            logger.info("(%d/%d) 処理中: %s", i, len(hall_list), hall_url)
-            df_hall = extract_result_data(hall_url, h.period)
-            if not df_hall.empty:
-                frames.append(df_hall)
-        except Exception as e:
-            logger.exception("ホール処理でエラー: %s", e)
-
-    df_all = pd.concat(frames, ignore_index=True)
-
-    # 列の順番を固定（下流の処理を安定化）
-    cols = ["pref", "hall", "model", "date", "台番", "G数", "BB", "RB", "差枚"]
-    for c in cols:
-        if c not in df_all.columns:
-            df_all[c] = pd.NA
-    df_all = df_all[cols]
-    df_all.to_csv(config.CSV_DIR / "all_result_data.csv", index=False)
+    return hall_list
+
+
+# 列の順番を固定（下流の処理を安定化）
+RESULT_COLUMNS = ["pref", "hall", "model", "date", "台番", "G数", "BB", "RB", "差枚"]
+
+
+def fix_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """all_result_data.csv と同じ列・順番にそろえる"""
+    df = df.copy()
+    for c in RESULT_COLUMNS:
+        if c not in df.columns:
+            df[c] = pd.NA
+    return df[RESULT_COLUMNS]
+
+
+def iter_hall_frames(
+    hall_list: list[config.HallInfo],
+    workers: int,
+    manifest: ScrapeManifest,
+    checkpoint: CheckpointStore,
+) -> Iterator[ScrapedHall]:
+    """ホールを取得し、取得できたものから順に返す（行のないホールは返さない）"""
+    if workers > 1:
+        for _, scraped in iter_halls_concurrently(
+            hall_list, workers=workers, manifest=manifest, checkpoint=checkpoint
+        ):
+            if not scraped.df.empty:
+                yield scraped
+        return
+
+    # ブラウザは1回だけ起動し、ホールごとに context/page を作り直す
+    # （取り直し用の Playwright も必要になったときに1回だけ起動する）
+    with open_session() as session, LazyBrowserSession() as fallback:
+        for i, h in enumerate(hall_list, start=1):
+            scraped = scrape_hall(
+                session, h, i, len(hall_list), manifest, checkpoint, fallback
+            )
+            if not scraped.df.empty:
+                yield scraped
+        session.log_summary()
+
+
+def scrape_and_upload(
+    test_mode=False, workers=config.SCRAPE_WORKERS, force=False, resume=False
+) -> None:
+    """
+    ホールを取得し終えたそばから前処理・アップロードに回す。
+    all_result_data.csv / cleaned_all_result_data.csv と DB の内容は一括処理と同じになる
+    取得した機種ページは、そのホールのアップロードが済んでから manifest に記録する
+    """
+    start = time.perf_counter()
+
+    hall_list = load_hall_list(test_mode)
+    manifest = ScrapeManifest(force=force)
+    checkpoint = CheckpointStore.resume() if resume else CheckpointStore.new_run()
+
+    resumed_pages: list[tuple[str, str, str]] = []
+    with UploadPipeline(manifest=manifest) as pipeline:
+        scraped_halls = iter_hall_frames(hall_list, workers, manifest, checkpoint)
+        if resume:
+            # 前回までの実行分も含めてチェックポイントからホール単位で流す
+            # （ページとホールの対応が取れないため、manifest には全体が成功してから記録する）
+            for scraped in scraped_halls:
+                resumed_pages.extend(scraped.pages)
+            for df_hall in checkpoint.iter_halls():
+                pipeline.put(fix_columns(df_hall))
+        else:
+            for scraped in scraped_halls:
+                pipeline.put(fix_columns(scraped.df), scraped.pages)
+    manifest.mark_done_many(resumed_pages)
+
+    logger.info("取得済みのためスキップした機種ページ: %d 件", manifest.skipped)
+    if pipeline.halls == 0:
+        logger.info("新しく取得したデータはありません。")
 
     end = time.perf_counter()
     logger.info("全体処理時間: %.2f 秒", end - start)
 
-    return df_all
-
 
 if __name__ == "__main__":
 
-    df = scraper_all_hall(test_mode=False)
-
-    df = df_data_clean(df)
-
-    supabase = data_to_supabase.get_supabase_client()
-    data_to_supabase.add_model(df, supabase)
-    data_to_supabase.add_prefecture_and_hall(df, supabase)
-    data_to_supabase.add_data_result(df, supabase)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--test", action="store_true", help="先頭2ホールのみ実行")
+    parser.add_argument(
+        "--workers", type=int, default=config.SCRAPE_WORKERS, help="並列ワーカー数"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="取得済みのページも含めてすべて取り直す"
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="直近の実行のチェックポイントから再開する"
+    )
+    args = parser.parse_args()
+
+    scrape_and_upload(
+        test_mode=args.test, workers=args.workers, force=args.force, resume=args.resume
+    )
@@ -8,6 +8,7 @@ from config import config
 from utils.logger_setup import setup_logger
 from utils.utils import _norm_text
 from scraper.scraping_hall_page import extract_date_url
+from scraper.bulk_extract import extract_links
 
 # =========================
 # 設定・ロガー
@@ -49,12 +50,21 @@ def extract_model_url(
         logger.warning("機種リンクが見つかりません: %s", date_url)
         return model_urls
 
-    links = page.locator(css)
-    count = links.count()
-    for j in range(count):
-        model_text = _norm_text(links.nth(j).inner_text())
+    links = extract_links(page, css)
+
+    return build_model_urls(pref, hall, date, date_url, links)
+
+
+def build_model_urls(
+    pref: str, hall: str, date: str, date_url: str, links: list[tuple[str, str]]
+) -> list[tuple[str, str, str, str, str]]:
+    """
+    機種リンク (テキスト, href) から "ジャグラー" を含むものを抽出
+    returns: List[(pref, hall, date, date_url, model_url)]
+    """
+    model_urls: list[tuple[str, str, str, str, str]] = []
+    for model_text, href in links:
         if "ジャグラー" in model_text:
-            href = links.nth(j).get_attribute("href") or ""
             model_urls.append((pref, hall, date, date_url, href))
 
     logger.info("機種リンク抽出: %d 件", len(model_urls))
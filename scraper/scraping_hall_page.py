@@ -1,13 +1,12 @@
 from playwright.sync_api import sync_playwright
 from urllib.parse import quote, urljoin
 import pandas as pd
-import re
-import datetime as dt
 import os
 
 from config import config
-from utils.utils import _norm_text
+from utils.utils import _norm_text, parse_date_text
 from utils.logger_setup import setup_logger
+from scraper.bulk_extract import extract_links
 
 # =========================
 # ロガー
@@ -45,30 +44,30 @@ def extract_date_url(hall_url, page, period) -> list[tuple[str, str, str, str]]:
     # 日付リンク
     css = "#content div table tbody tr td a"
     page.wait_for_selector(css, timeout=15_000)
-    links = page.locator(css)
-    count = links.count()
+    links = extract_links(page, css)
+
+    return build_date_urls(pref, hall, links, period)
+
+
+def build_date_urls(
+    pref: str, hall: str, links: list[tuple[str, str]], period: int
+) -> list[tuple[str, str, str, str]]:
+    """
+    日付リンク (テキスト, href) の先頭 period 件を日付URLリストに変換し CSV に保存する
+    returns: List[(prefecture, hall, date(YYYY-MM-DD), date_url)]
+    """
+    count = len(links)
     logger.debug(f"link取得数: {count}")
     take = min(period, count)
     logger.debug(f"take: {take}")
 
     date_urls: list[tuple[str, str, str, str]] = []
-    for i in range(take):
-        href = links.nth(i).get_attribute("href") or ""
-        date_text = _norm_text(links.nth(i).inner_text())
-
+    for date_text, href in links[:take]:
         # "YYYY/MM/DD" or "M/D" に対応
-        m = re.match(r"(?:(\d{4})/)?(\d{1,2})/(\d{1,2})", date_text)
-        if not m:
+        date_iso = parse_date_text(date_text)
+        if date_iso is None:
             logger.warning("日付文字列を解釈できません: %s", date_text)
             continue
-        y, mth, d = m.groups()
-        if y is None:
-            y = str(dt.date.today().year)
-        try:
-            date_iso = dt.date(int(y), int(mth), int(d)).strftime("%Y-%m-%d")
-        except ValueError:
-            logger.warning("日付に変換できません: %s", date_text)
-            continue
 
         date_urls.append((pref, hall, date_iso, href))
 
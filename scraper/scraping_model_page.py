@@ -9,6 +9,7 @@ from utils.logger_setup import setup_logger
 from utils.utils import _norm_text, extract_model_name
 from scraper.scraping_hall_page import extract_date_url
 from scraper.scraping_date_page import extract_model_url
+from scraper.bulk_extract import extract_table, extract_texts
 
 # =========================
 # 設定・ロガー
@@ -49,16 +50,8 @@ def extract_model_data(
         model = ""
         css = "div.tab_content > h2"
         try:
-            TARGET_MODEL = "ジャグラー"
             page.wait_for_selector(css, timeout=10_000)
-            h2s = page.locator(css)
-            for i in range(h2s.count()):
-                txt = extract_model_name(h2s.nth(i).inner_text())
-                if TARGET_MODEL in txt:
-                    model = txt
-                    break
-            if not model and h2s.count():
-                model = extract_model_name(h2s.nth(i).inner_text())
+            model = pick_model_name(extract_texts(page, css))
             logger.info(f"機種名: {model}")
         except PWTimeout:
             logger.warning("機種タイトルが取得できませんでした: %s", url)
@@ -71,36 +64,42 @@ def extract_model_data(
             logger.debug("テーブルが見つかりません。")
             # return []
 
-        rows = page.locator(css)
-        # th行(header)処理
-        ths = rows.nth(0).locator("th")
-        header = [_norm_text(ths.nth(i).inner_text()) for i in range(ths.count())]
+        # th行(header) と td(data)行を1回の evaluate でまとめて取得（空行はスキップ）
+        header, table = extract_table(page, css)
         logger.debug(header)
-        # td(date)行処理
-        table: list[list[str]] = []
-        for j in range(rows.count()):
-            tds = rows.nth(j).locator("td")
-            row = []
-            for k in range(tds.count()):
-                row.append(_norm_text(tds.nth(k).inner_text()))
-            if row:  # 空行スキップ
-                table.append(row)
-
-        logger.info(f"{len(table)} 行の機種データを取得")
-        for t in table:
-            logger.debug(t)
-
-        df = pd.DataFrame(table, columns=header)
-        df = df[~df["台番"].astype(str).str.contains("平均")]
-        df["pref"] = pref
-        df["hall"] = hall
-        df["model"] = model
-        df["date"] = date
-        frames.append(df)
+
+        frames.append(build_model_frame(header, table, pref, hall, model, date))
 
     return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
 
 
+def pick_model_name(h2_texts: list[str]) -> str:
+    """機種名 (h2 に "ジャグラー" を含むものを優先、なければ最後の h2)"""
+    TARGET_MODEL = "ジャグラー"
+    names = [extract_model_name(t) for t in h2_texts]
+    model = next((t for t in names if TARGET_MODEL in t), "")
+    if not model and names:
+        model = names[-1]
+    return model
+
+
+def build_model_frame(
+    header: list[str], table: list[list[str]], pref: str, hall: str, model: str, date: str
+) -> pd.DataFrame:
+    """機種テーブルを DataFrame にして、平均行を除き pref/hall/model/date を付与する"""
+    logger.info(f"{len(table)} 行の機種データを取得")
+    for t in table:
+        logger.debug(t)
+
+    df = pd.DataFrame(table, columns=header)
+    df = df[~df["台番"].astype(str).str.contains("平均")]
+    df["pref"] = pref
+    df["hall"] = hall
+    df["model"] = model
+    df["date"] = date
+    return df
+
+
 if __name__ == "__main__":
 
     period = 1
@@ -1,5 +1,5 @@
-from playwright.sync_api import sync_playwright
 # from playwright.sync_api import Page, sync_playwright, TimeoutError as PWTimeout
+from dataclasses import dataclass, field
 import pandas as pd
 from urllib.parse import quote, urljoin
 import os
@@ -7,20 +7,72 @@ import os
 from config import config
 from utils.logger_setup import setup_logger
 from utils.utils import _norm_text, extract_model_name
-from scraper.scraping_hall_page import extract_date_url
-from scraper.scraping_date_page import extract_model_url
-from scraper.scraping_model_page import extract_model_data
+from scraper.browser_session import LazyBrowserSession, ScrapeSession
+from scraper.backends import get_backend, open_session
+from scraper.manifest import ScrapeManifest
+from scraper.checkpoint import CheckpointStore
 
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
 
-def extract_result_data(hall_url: str, period: int = 1):
+
+def hall_url_of(h: config.HallInfo) -> str:
+    """halls.yaml の slug からホールページの url を作成"""
+    return urljoin(config.MAIN_URL, quote(h.slug))
+
+
+# (hall, date, model_url): manifest に記録する単位
+Page = tuple[str, str, str]
+
+
+@dataclass
+class ScrapedHall:
+    """
+    1ホール分の取得結果と、その行の元になった機種ページ。
+    pages はアップロードが済んでから manifest に記録する（UploadPipeline が行う）
+    """
+
+    df: pd.DataFrame
+    pages: list[Page] = field(default_factory=list)
+
+
+def extract_result_data(
+    hall_url: str,
+    period: int = 1,
+    session: ScrapeSession | None = None,
+    manifest: ScrapeManifest | None = None,
+    checkpoint: CheckpointStore | None = None,
+    collected: list[pd.DataFrame] | None = None,
+    pages: list[Page] | None = None,
+):
     """
     ホールurlリストと日付urlリストを受けて、そのホールの対象日・対象機種の全データを返す
+    session を渡した場合は起動済みのブラウザを使い回し、ホール用の context/page だけを作る
+    取得関数は session の種類（config.SCRAPER_BACKEND）に応じて切り替わる
+    manifest を渡した場合は取得済みの機種ページをスキップし、取得できたページを記録する
+    checkpoint を渡した場合はホール・日付ごとに結果を保存し、保存済みの日付はスキップする
+    collected を渡した場合は取得し終えた日付の結果をその場で追加する
+    （途中でエラーになっても、取得し終えた日付の行は呼び出し側に残る）
+    pages を渡した場合は manifest には記録せず、取得できた機種ページを pages に追加する
+    （呼び出し側がアップロード後に記録する）。pages にある機種ページは取り直さない
     """
 
+    if session is None:
+        with open_session() as own_session:
+            return extract_result_data(
+                hall_url, period, own_session, manifest, checkpoint, collected, pages
+            )
+
+    backend = get_backend(session.backend)
+    extract_date_url = backend.extract_date_url
+    extract_model_url = backend.extract_model_url
+    extract_model_data = backend.extract_model_data
+
     df_frames: list = []
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+    with session.new_page() as page:
 
         date_urls = extract_date_url(hall_url, page, period=period)
 
@@ -28,27 +80,126 @@ def extract_result_data(hall_url: str, period: int = 1):
             df_model_urls: list = []
             columns = ["pref", "hall", "date", "date_url", "model_url"]
             for pref, hall, date, date_url in date_urls:
-                model_urls = extract_model_url(page, hall, pref, date_url, date)
-                if not model_urls:
+                if checkpoint is not None and checkpoint.is_done(hall_url, date):
+                    logger.info("チェックポイント済みのためスキップ: %s %s", hall, date)
                     continue
-                df_model_url = pd.DataFrame(model_urls, columns=columns)
-                df_model_urls.append(df_model_url)
 
-                df_model = extract_model_data(page, model_urls)
-                if not df_model.empty:
-                    df_frames.append(df_model)
+                date_frames: list = []
+                done_urls: list[str] = []
+                model_urls = extract_model_url(page, hall, pref, date_url, date)
+                if model_urls:
+                    df_model_url = pd.DataFrame(model_urls, columns=columns)
+                    df_model_urls.append(df_model_url)
+                    if manifest is not None:
+                        model_urls = manifest.filter_new(model_urls)
+                    if pages:
+                        # 取り直しのとき、前の取得で取れていた機種ページは飛ばす
+                        taken = set(pages)
+                        model_urls = [m for m in model_urls if (hall, date, m[4]) not in taken]
+
+                # 機種ページ単位で取得し、取得できたものを記録する
+                for model_url in model_urls:
+                    df_model = extract_model_data(page, [model_url])
+                    if not df_model.empty:
+                        date_frames.append(df_model)
+                        done_urls.append(model_url[4])
+                df_frames.extend(date_frames)
+                if collected is not None:
+                    collected.extend(date_frames)
+
+                # ホール・日付単位で保存し、取得できたページを記録する（または呼び出し側に渡す）
+                if checkpoint is not None:
+                    checkpoint.save(hall_url, date, date_frames)
+                if pages is not None:
+                    pages.extend((hall, date, url) for url in done_urls)
+                elif manifest is not None:
+                    manifest.mark_done_many([(hall, date, url) for url in done_urls])
 
-            df_csv = pd.concat(df_model_urls)
-            df_csv.to_csv(config.CSV_DIR / f"{pref}_{hall}_model_urls.csv", index=False)
+            if df_model_urls:
+                df_csv = pd.concat(df_model_urls)
+                df_csv.to_csv(config.CSV_DIR / f"{pref}_{hall}_model_urls.csv", index=False)
 
         finally:
-            browser.close()
-            df_csv = pd.concat(df_frames, ignore_index=True)
+            df_csv = pd.concat(df_frames, ignore_index=True) if df_frames else pd.DataFrame()
             df_csv.to_csv(config.CSV_DIR / f"{pref}_{hall}_result_data.csv", index=False)
 
         return df_csv
 
 
+def scrape_hall(
+    session: ScrapeSession,
+    h: config.HallInfo,
+    i: int = 1,
+    n: int = 1,
+    manifest: ScrapeManifest | None = None,
+    checkpoint: CheckpointStore | None = None,
+    fallback: LazyBrowserSession | None = None,
+) -> ScrapedHall:
+    """
+    1ホール分を取得して処理時間を記録し、行と取得できた機種ページ（manifest には未記録）を返す。
+    エラー時はログを出し、それまでに取得し終えた日付の行を返す。
+    checkpoint を渡した場合は、保存済みの日付（Playwright での取り直しでスキップされる日付を含む）を
+    チェックポイントから読み直して返す。
+    http バックエンドでエラーになった場合は、設定に応じて Playwright で取り直す
+    （fallback を渡した場合はそのブラウザを使い回す。なければこのホールのためだけに起動する）
+    """
+    hall_url = hall_url_of(h)
+    if checkpoint is not None and checkpoint.is_hall_done(hall_url):
+        logger.info("(%d/%d) チェックポイント済みのためスキップ: %s", i, n, hall_url)
+        return ScrapedHall(pd.DataFrame())
+    collected: list[pd.DataFrame] = []
+    pages: list[Page] = []
+    try:
+        with session.timed(hall_url) as timing:
+            logger.info("(%d/%d) 処理中: %s", i, n, hall_url)
+            extract_result_data(
+                hall_url, h.period, session, manifest, checkpoint, collected, pages
+            )
+            timing.rows = sum(len(df) for df in collected)
+        if checkpoint is not None:
+            checkpoint.mark_hall_done(hall_url)
+        return ScrapedHall(_concat(collected), pages)
+    except Exception as e:
+        logger.exception("ホール処理でエラー: %s", e)
+        if session.backend == "playwright" or not config.SCRAPER_FALLBACK:
+            return ScrapedHall(_partial(hall_url, collected, checkpoint), pages)
+
+    logger.info("Playwright で再取得します: %s", hall_url)
+    own_fallback = fallback is None
+    if own_fallback:
+        fallback = LazyBrowserSession()
+    try:
+        extract_result_data(
+            hall_url, h.period, fallback.get(), manifest, checkpoint, collected, pages
+        )
+        if checkpoint is not None:
+            checkpoint.mark_hall_done(hall_url)
+    except Exception as e:
+        logger.exception("ホール処理でエラー (Playwright): %s", e)
+        return ScrapedHall(_partial(hall_url, collected, checkpoint), pages)
+    finally:
+        if own_fallback:
+            fallback.close()
+    if checkpoint is not None:
+        # チェックポイント済みのため取り直しでスキップした日付も含める
+        return ScrapedHall(checkpoint.load_hall(hall_url), pages)
+    return ScrapedHall(_concat(collected), pages)
+
+
+def _concat(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _partial(
+    hall_url: str, collected: list[pd.DataFrame], checkpoint: CheckpointStore | None
+) -> pd.DataFrame:
+    """エラーになったホールの、取得し終えた日付の行"""
+    df = checkpoint.load_hall(hall_url) if checkpoint is not None else _concat(collected)
+    if not df.empty:
+        logger.warning("取得し終えた日付の %d 行だけを返します: %s", len(df), hall_url)
+    return df
+
+
 if __name__ == "__main__":
 
     period = 1
@@ -0,0 +1,154 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+import datetime as dt
+import json
+import os
+import random
+import threading
+import time
+
+from config import config
+from utils.logger_setup import setup_logger
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+@dataclass
+class UploadResult:
+    rows: int = 0
+    sent: int = 0
+    failed: int = 0
+    batches: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+    dead_letter: Path | None = None
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.sent / self.seconds if self.seconds else 0.0
+
+
+# =========================
+# バッチ upsert
+# =========================
+def upsert_batches(
+    supabase,
+    table: str,
+    records: list[dict],
+    on_conflict: str,
+    batch_size: int = config.UPLOAD_BATCH_SIZE,
+    workers: int = config.UPLOAD_WORKERS,
+    max_retries: int = config.UPLOAD_MAX_RETRIES,
+    backoff: float = config.UPLOAD_BACKOFF_SECONDS,
+    dead_letter: bool = True,
+) -> UploadResult:
+    """
+    records を batch_size 件ずつに分け、workers 本のスレッドで並列に upsert する。
+    失敗したバッチは指数バックオフ（backoff × 2^n + ゆらぎ）で max_retries 回まで再送し、
+    それでも失敗したバッチは data/state/dead_letter/ に JSON Lines で保存して処理を続ける
+    （dead_letter=False のときは保存せず、呼び出し側が result.failed を見て扱う）。
+    supabase は table(name).upsert(rows, on_conflict=...).execute() を持つものなら何でもよい
+    """
+    result = UploadResult(rows=len(records))
+    if not records:
+        return result
+
+    batches = [records[i : i + batch_size] for i in range(0, len(records), batch_size)]
+    result.batches = len(batches)
+    lock = threading.Lock()
+    dead: list[list[dict]] = []
+
+    def send(batch: list[dict]) -> None:
+        for attempt in range(max_retries + 1):
+            try:
+                supabase.table(table).upsert(batch, on_conflict=on_conflict).execute()
+                with lock:
+                    result.sent += len(batch)
+                return
+            except Exception as e:
+                if attempt == max_retries:
+                    logger.error(f"⚠ {table} upsert 失敗 ({len(batch)} 件): {e}")
+                    with lock:
+                        result.failed += len(batch)
+                        dead.append(batch)
+                    return
+                wait = backoff * 2**attempt + random.uniform(0, backoff)
+                logger.warning(
+                    f"{table} upsert 再送 {attempt + 1}/{max_retries} ({wait:.1f} 秒後): {e}"
+                )
+                with lock:
+                    result.retries += 1
+                time.sleep(wait)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="upload") as pool:
+        for f in as_completed([pool.submit(send, b) for b in batches]):
+            f.result()
+    result.seconds = time.perf_counter() - start
+
+    if dead and dead_letter:
+        result.dead_letter = write_dead_letter(table, on_conflict, dead)
+
+    logger.info(
+        f"{table} upsert: {result.sent}/{result.rows} 件 "
+        f"({result.batches} バッチ, 再送 {result.retries} 回, "
+        f"{result.seconds:.2f} 秒, {result.rows_per_sec:,.0f} 行/秒)"
+    )
+    return result
+
+
+# =========================
+# デッドレター
+# =========================
+def write_dead_letter(table: str, on_conflict: str, batches: list[list[dict]]) -> Path:
+    """送信できなかったバッチを1行1バッチで保存する"""
+    config.DEAD_LETTER_DIR.mkdir(exist_ok=True)
+    stamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    path = config.DEAD_LETTER_DIR / f"{table}_{stamp}.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for batch in batches:
+            line = {"table": table, "on_conflict": on_conflict, "rows": batch}
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+    logger.error(f"⚠ 送信できなかった {len(batches)} バッチを保存しました: {path}")
+    return path
+
+
+def retry_dead_letters(supabase, **kwargs) -> None:
+    """
+    保存済みのデッドレターを再送する。
+    すべて送れたファイルは削除し、送れなかったバッチが残ったファイルはそのバッチだけに書き直す
+    （再送の途中で止まっても、送れていないバッチは消えない）
+    """
+    if not config.DEAD_LETTER_DIR.exists():
+        return
+    for path in sorted(config.DEAD_LETTER_DIR.glob("*.jsonl")):
+        with open(path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        logger.info(f"デッドレターを再送します: {path} ({len(lines)} バッチ)")
+        remaining = [
+            line
+            for line in lines
+            if upsert_batches(
+                supabase,
+                line["table"],
+                line["rows"],
+                line["on_conflict"],
+                dead_letter=False,
+                **kwargs,
+            ).failed
+        ]
+        if not remaining:
+            path.unlink()
+            logger.info(f"デッドレターの再送が完了しました: {path}")
+            continue
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for line in remaining:
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+        os.replace(tmp, path)
+        logger.error(f"⚠ 再送できなかった {len(remaining)} バッチを残します: {path}")
@@ -0,0 +1,60 @@
+-- =========================
+-- ダッシュボード用の集計関数（supabase.rpc で呼び出す）
+-- 台ごとの行を Streamlit に送らず、集計済みの値だけを返す。
+-- 平均は「合計 / 件数」で戻せるよう、合計と件数を返す（SubTotal の計算に使う）。
+-- Supabase の SQL Editor、または psql -f で実行する。
+-- =========================
+
+
+-- ホール × 日付（02_ホール別出玉率履歴）
+create or replace function hall_date_stats(p_start date, p_end date)
+returns table (
+    hall text,
+    date date,
+    unit_count bigint,
+    game_sum bigint,
+    medal_sum bigint
+)
+language sql
+stable
+as $$
+    select
+        r.hall::text,
+        r.date::date,
+        count(*),
+        sum(r.game),
+        sum(r.medal)
+    from result_joined r
+    where r.date between p_start and p_end
+    group by r.hall, r.date
+$$;
+
+
+-- ホール × 機種 × 日付（03_機種別出玉率履歴）
+create or replace function hall_model_date_stats(p_start date, p_end date)
+returns table (
+    hall text,
+    model text,
+    date date,
+    unit_count bigint,
+    game_sum bigint,
+    medal_sum bigint
+)
+language sql
+stable
+as $$
+    select
+        r.hall::text,
+        r.model::text,
+        r.date::date,
+        count(*),
+        sum(r.game),
+        sum(r.medal)
+    from result_joined r
+    where r.date between p_start and p_end
+    group by r.hall, r.model, r.date
+$$;
+
+
+grant execute on function hall_date_stats(date, date) to anon, authenticated;
+grant execute on function hall_model_date_stats(date, date) to anon, authenticated;
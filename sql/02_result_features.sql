@@ -0,0 +1,42 @@
+-- =========================
+-- ページの絞り込みを PostgREST 側で行うためのビューと関数
+-- 01_aggregate_functions.sql と同じく、Supabase の SQL Editor、または psql -f で実行する。
+-- =========================
+
+
+-- result_joined + 日付から作る列（曜日・日・末尾日で eq / in フィルタできるようにする）
+-- weekday_num は pandas の dt.weekday と同じ 月=0 … 日=6
+create or replace view result_features as
+select
+    r.*,
+    extract(day from r.date)::smallint as day,
+    (extract(isodow from r.date)::integer - 1)::smallint as weekday_num,
+    (extract(day from r.date)::integer % 10)::smallint as day_last
+from result_joined r;
+
+
+-- 期間内にデータのある ホール × 機種 × 台番号（セレクトボックスの選択肢用）
+-- 行そのものではなく、台ごとに1行（と日数）だけを返す
+create or replace function result_units(p_start date, p_end date)
+returns table (
+    hall text,
+    model text,
+    unit_no integer,
+    day_count bigint
+)
+language sql
+stable
+as $$
+    select
+        r.hall::text,
+        r.model::text,
+        r.unit_no::integer,
+        count(*)
+    from result_joined r
+    where r.date between p_start and p_end
+    group by r.hall, r.model, r.unit_no
+$$;
+
+
+grant select on result_features to anon, authenticated;
+grant execute on function result_units(date, date) to anon, authenticated;
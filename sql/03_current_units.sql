@@ -0,0 +1,37 @@
+-- =========================
+-- 現在設置されている台（ホール × 機種 × 台番号）
+-- データのある最新日から3日間に出てくる台を「設置中」とみなす。
+-- スクレイパーがアップロード後に refresh_current_units() を呼んで更新する。
+-- 01_aggregate_functions.sql と同じく、Supabase の SQL Editor、または psql -f で実行する。
+-- =========================
+
+
+create materialized view if not exists current_units as
+select distinct
+    r.hall::text as hall,
+    r.model::text as model,
+    r.unit_no::integer as unit_no
+from result_joined r
+where r.date >= (select max(date) from results) - 2;
+
+-- concurrently での更新に必要（更新中も読み出しを止めない）
+create unique index if not exists current_units_key on current_units (hall, model, unit_no);
+
+
+-- 更新して台数を返す（マテリアライズドビューの所有者の権限で実行する）
+create or replace function refresh_current_units()
+returns bigint
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    refresh materialized view concurrently current_units;
+    return (select count(*) from current_units);
+end;
+$$;
+
+
+grant select on current_units to anon, authenticated;
+revoke execute on function refresh_current_units() from public, anon, authenticated;
+grant execute on function refresh_current_units() to service_role;
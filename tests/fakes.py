@@ -0,0 +1,72 @@
+"""テスト用の Supabase クライアント（table().upsert()/select() と rpc() の execute() だけ）"""
+from types import SimpleNamespace
+
+# マスタテーブルの ID 列（upsert の返却行に付ける）
+ID_COLUMNS = {"prefectures": "prefecture_id", "halls": "hall_id", "models": "model_id"}
+
+
+class FakeRequest:
+    def __init__(self, run):
+        self._run = run
+
+    def execute(self):
+        return SimpleNamespace(data=self._run())
+
+
+class FakeTable:
+    def __init__(self, client: "FakeSupabase", name: str):
+        self.client = client
+        self.name = name
+
+    def upsert(self, rows: list[dict], on_conflict: str = "") -> FakeRequest:
+        return FakeRequest(lambda: self.client._upsert(self.name, rows, on_conflict))
+
+    def select(self, columns: str = "*") -> FakeRequest:
+        return FakeRequest(lambda: [dict(r) for r in self.client.tables.get(self.name, [])])
+
+
+class FakeSupabase:
+    """
+    upsert は on_conflict の列で既存行を置き換え、マスタテーブルには連番の ID を付けて返す。
+    fail_times[table] 回だけ upsert を失敗させられる（再送のテスト用）
+    """
+
+    def __init__(self, fail_times: dict[str, int] | None = None):
+        self.tables: dict[str, list[dict]] = {}
+        self.fail_times = dict(fail_times or {})
+        self.upsert_calls: dict[str, int] = {}
+        self.rpc_calls: list[str] = []
+
+    def table(self, name: str) -> FakeTable:
+        return FakeTable(self, name)
+
+    def rpc(self, name: str, params: dict) -> FakeRequest:
+        def run():
+            self.rpc_calls.append(name)
+            return len(self.tables.get("results", []))
+
+        return FakeRequest(run)
+
+    def _upsert(self, name: str, rows: list[dict], on_conflict: str) -> list[dict]:
+        self.upsert_calls[name] = self.upsert_calls.get(name, 0) + 1
+        if self.fail_times.get(name, 0) > 0:
+            self.fail_times[name] -= 1
+            raise ConnectionError(f"{name}: temporary failure")
+        table = self.tables.setdefault(name, [])
+        keys = [k.strip() for k in on_conflict.split(",") if k.strip()]
+        id_column = ID_COLUMNS.get(name)
+        returned = []
+        for row in rows:
+            row = dict(row)
+            match = next(
+                (r for r in table if keys and all(r[k] == row[k] for k in keys)), None
+            )
+            if match is None:
+                if id_column:
+                    row[id_column] = len(table) + 1
+                table.append(row)
+                returned.append(row)
+            else:
+                match.update(row)
+                returned.append(dict(match))
+        return returned
@@ -0,0 +1,105 @@
+"""
+sql/01_aggregate_functions.sql の集計関数を、ローカルの PostgreSQL に読み込んだ result_joined で
+pandas のピボット・集計と突き合わせる。
+接続先は TEST_DATABASE_URL（なければ pgserver で一時的に起動）。どちらもなければスキップする。
+"""
+import uuid
+
+import pandas as pd
+import pytest
+
+from conftest import FIXTURES, ROOT
+
+SQL_FILE = ROOT / "sql" / "01_aggregate_functions.sql"
+START, END = "2026-10-02", "2026-10-24"
+
+psycopg = pytest.importorskip("psycopg")
+
+
+@pytest.fixture(scope="module")
+def conn(database_url):
+    """一時スキーマに result_joined（テーブル）と集計関数を作成し、終了時にスキーマごと削除する"""
+    schema = f"test_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        # 関数の grant 先（Supabase では作成済みのロール）
+        for role in ("anon", "authenticated"):
+            conn.execute(
+                f"do $$ begin create role {role}; "
+                f"exception when duplicate_object then null; end $$"
+            )
+        conn.execute(f"create schema {schema}")
+        conn.execute(f"set search_path to {schema}")
+        try:
+            conn.execute(
+                """
+                create table result_joined (
+                    pref text, hall text, model text, unit_no integer, date date,
+                    game integer, bb integer, rb integer, medal integer
+                )
+                """
+            )
+            with conn.cursor().copy(
+                "copy result_joined from stdin with (format csv, header true)"
+            ) as copy:
+                copy.write((FIXTURES / "result_joined.csv").read_bytes())
+            conn.execute(SQL_FILE.read_text(encoding="utf-8"))
+            yield conn
+        finally:
+            conn.execute(f"drop schema {schema} cascade")
+
+
+@pytest.fixture(scope="module")
+def df():
+    """関数と同じ期間に絞った result_joined"""
+    df = pd.read_csv(FIXTURES / "result_joined.csv")
+    return df[df["date"].between(START, END)]
+
+
+def query(conn, sql: str, *params) -> pd.DataFrame:
+    cur = conn.execute(sql, params)
+    df = pd.DataFrame(cur.fetchall(), columns=[c.name for c in cur.description])
+    if "date" in df.columns:
+        df["date"] = df["date"].astype(str)
+    return df
+
+
+def assert_same(actual: pd.DataFrame, expected: pd.DataFrame, keys: list[str]) -> None:
+    actual = actual.sort_values(keys).reset_index(drop=True)
+    expected = expected.sort_values(keys).reset_index(drop=True)[list(actual.columns)]
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+# =========================
+# hall_date_stats / hall_model_date_stats
+# =========================
+def test_hall_date_stats(conn, df):
+    actual = query(conn, "select * from hall_date_stats(%s, %s)", START, END)
+
+    expected = pd.pivot_table(
+        df,
+        index=["hall", "date"],
+        values=["unit_no", "game", "medal"],
+        aggfunc={"unit_no": "count", "game": "sum", "medal": "sum"},
+    ).reset_index()
+    expected = expected.rename(
+        columns={"unit_no": "unit_count", "game": "game_sum", "medal": "medal_sum"}
+    )
+
+    assert_same(actual, expected, ["hall", "date"])
+
+
+def test_hall_model_date_stats(conn, df):
+    actual = query(conn, "select * from hall_model_date_stats(%s, %s)", START, END)
+
+    expected = pd.pivot_table(
+        df,
+        index=["hall", "model", "date"],
+        values=["unit_no", "game", "medal"],
+        aggfunc={"unit_no": "count", "game": "sum", "medal": "sum"},
+    ).reset_index()
+    expected = expected.rename(
+        columns={"unit_no": "unit_count", "game": "game_sum", "medal": "medal_sum"}
+    )
+
+    assert_same(actual, expected, ["hall", "model", "date"])
+
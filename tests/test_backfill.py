@@ -0,0 +1,182 @@
+"""
+scraper.backfill を REST（fake のクライアント）と COPY（ローカルの PostgreSQL）で流し、
+マージ結果・マスタの ID・除外行のレポートを確認する
+"""
+import types
+import uuid
+
+import pandas as pd
+import pytest
+
+from config import config
+from fakes import FakeSupabase
+from scraper import backfill, data_to_supabase, master_cache
+
+START, END = "2026-10-01", "2026-10-03"
+HALLS = [("東京都", "テストホール"), ("埼玉県", "テストホール"), ("東京都", "サンプル会館")]
+MODELS = ["マイジャグラーV", "ハッピージャグラーVIII"]
+
+SCHEMA = """
+create table prefectures (prefecture_id serial primary key, name text unique not null);
+create table halls (
+    hall_id serial primary key,
+    name text not null,
+    prefecture_id integer references prefectures,
+    unique (name, prefecture_id)
+);
+create table models (model_id serial primary key, name text unique not null);
+create table results (
+    result_id bigserial primary key,
+    hall_id integer not null references halls,
+    model_id integer not null references models,
+    unit_no integer not null,
+    date date not null,
+    game integer, bb integer, rb integer, medal integer,
+    unique (hall_id, model_id, unit_no, date)
+);
+"""
+
+
+def source_frame() -> pd.DataFrame:
+    """cleaned_all_result_data.csv と同じ列の入力（同じ行の重複と、数値にできない行を含む）"""
+    rows = [
+        (pref, hall, model, date, unit_no, 1000 + unit_no, 4, 3, unit_no - 100)
+        for pref, hall in HALLS
+        for model in MODELS
+        for date in pd.date_range(START, END).strftime("%Y-%m-%d")
+        for unit_no in (101, 102)
+    ]
+    df = pd.DataFrame(
+        rows, columns=["pref", "hall", "model", "date", "unit_no", "game", "bb", "rb", "medal"]
+    ).astype({"game": object})
+    duplicate = df.iloc[[0]]
+    bad = df.iloc[[1, len(df) - 1]].assign(game="-")
+    return pd.concat([df, duplicate, bad], ignore_index=True)
+
+
+def expected_results(df: pd.DataFrame) -> pd.DataFrame:
+    """除外行を落とし、重複を1行にした (pref, hall, model, unit_no, date) ごとの値"""
+    ok = df[df["game"] != "-"].astype({"game": "int64"})
+    keys = ["pref", "hall", "model", "unit_no", "date"]
+    return ok.drop_duplicates(subset=keys).sort_values(keys).reset_index(drop=True)[
+        [*keys, "game", "bb", "rb", "medal"]
+    ]
+
+
+def make_args(db_url=None) -> types.SimpleNamespace:
+    # 1日ずつのシャードを2本並列に、小さいチャンクで流す
+    return types.SimpleNamespace(
+        start=START, end=END, shard_days=1, chunksize=5, workers=2,
+        sqlite_table="result_data", db_url=db_url,
+    )
+
+
+@pytest.fixture
+def state(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CSV_DIR", tmp_path)
+    monkeypatch.setattr(config, "STATE_DIR", tmp_path)
+    monkeypatch.setattr(data_to_supabase, "_rejected_started", False)
+    return tmp_path
+
+
+def write_source(path, df: pd.DataFrame) -> str:
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def read_rejected(state) -> pd.DataFrame:
+    return pd.read_csv(state / "rejected_results.csv")
+
+
+# =========================
+# REST（upsert_batches）
+# =========================
+def test_backfill_rest(state, monkeypatch):
+    client = FakeSupabase()
+    monkeypatch.setattr(data_to_supabase, "get_supabase_client", lambda: client)
+    monkeypatch.setattr(master_cache, "_cache", master_cache.MasterCache(state / "ids.json"))
+    df = source_frame()
+
+    backfill.backfill(write_source(state / "source.csv", df), make_args())
+
+    halls = {(h["prefecture_id"], h["name"]): h["hall_id"] for h in client.tables["halls"]}
+    assert len(halls) == len(HALLS)
+    assert len(client.tables["results"]) == len(expected_results(df))
+    # 別のシャード（スレッド）で除外した行も、すべて1つのレポートに残る
+    rejected = read_rejected(state)
+    assert sorted(rejected["date"]) == [START, END]
+    assert set(rejected["reason"]) == {"数値変換エラー"}
+
+
+# =========================
+# COPY（ローカルの PostgreSQL）
+# =========================
+@pytest.fixture
+def pg_url(database_url):
+    """一時スキーマにマスタと results を作り、search_path をそのスキーマにした接続文字列を返す"""
+    psycopg = pytest.importorskip("psycopg")
+    from psycopg.conninfo import make_conninfo
+
+    schema = f"test_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(database_url, autocommit=True) as conn:
+        conn.execute(f"create schema {schema}")
+        conn.execute(f"set search_path to {schema}")
+        conn.execute(SCHEMA)
+        try:
+            yield make_conninfo(database_url, options=f"-c search_path={schema}")
+        finally:
+            conn.execute(f"drop schema {schema} cascade")
+
+
+def fetch_results(pg_url) -> pd.DataFrame:
+    import psycopg
+
+    with psycopg.connect(pg_url) as conn:
+        cur = conn.execute(
+            """
+            select p.name as pref, h.name as hall, m.name as model, r.unit_no,
+                   r.date::text as date, r.game, r.bb, r.rb, r.medal
+            from results r
+            join halls h using (hall_id)
+            join prefectures p using (prefecture_id)
+            join models m using (model_id)
+            order by pref, hall, model, unit_no, date
+            """
+        )
+        return pd.DataFrame(cur.fetchall(), columns=[c.name for c in cur.description])
+
+
+def fetch_master_ids(pg_url) -> dict[str, list[tuple]]:
+    import psycopg
+
+    with psycopg.connect(pg_url) as conn:
+        return {
+            "prefectures": conn.execute("select prefecture_id, name from prefectures order by 1").fetchall(),
+            "halls": conn.execute("select hall_id, name, prefecture_id from halls order by 1").fetchall(),
+            "models": conn.execute("select model_id, name from models order by 1").fetchall(),
+        }
+
+
+def test_backfill_copy_is_idempotent(state, pg_url, monkeypatch):
+    df = source_frame()
+    source = write_source(state / "source.csv", df)
+
+    backfill.backfill(source, make_args(pg_url))
+
+    actual = fetch_results(pg_url)
+    pd.testing.assert_frame_equal(actual, expected_results(df), check_dtype=False)
+    ids = fetch_master_ids(pg_url)
+    assert {name for _, name in ids["prefectures"]} == {pref for pref, _ in HALLS}
+    # 同名のホールも都道府県ごとに別の ID になる
+    assert len(ids["halls"]) == len(HALLS)
+    assert {name for _, name in ids["models"]} == set(MODELS)
+    assert len(read_rejected(state)) == 2
+
+    # 同じ範囲を値を1つ変えて流し直しても、行は増えずに値だけが更新され、マスタの ID も変わらない
+    monkeypatch.setattr(data_to_supabase, "_rejected_started", False)
+    df.loc[2, "medal"] = 999
+    backfill.backfill(write_source(state / "source.csv", df), make_args(pg_url))
+
+    pd.testing.assert_frame_equal(fetch_results(pg_url), expected_results(df), check_dtype=False)
+    assert fetch_master_ids(pg_url) == ids
+    assert len(read_rejected(state)) == 2
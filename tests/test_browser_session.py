@@ -0,0 +1,31 @@
+"""scraper.browser_session の起動・終了処理を fake の Playwright で確認する"""
+import types
+
+import pytest
+
+browser_session = pytest.importorskip("scraper.browser_session")
+
+
+class FakePlaywright:
+    def __init__(self):
+        self.stopped = False
+        self.chromium = types.SimpleNamespace(launch=self.launch)
+
+    def launch(self, headless: bool):
+        raise RuntimeError("Executable doesn't exist")
+
+    def stop(self) -> None:
+        self.stopped = True
+
+
+def test_failed_launch_stops_playwright(monkeypatch):
+    playwright = FakePlaywright()
+    monkeypatch.setattr(
+        browser_session, "sync_playwright", lambda: types.SimpleNamespace(start=lambda: playwright)
+    )
+
+    with pytest.raises(RuntimeError, match="Executable"):
+        with browser_session.BrowserSession():
+            pass
+
+    assert playwright.stopped
@@ -0,0 +1,203 @@
+"""
+http バックエンドの HTML 解析（parse_*_page）を保存済みの HTML で確認する（ネットワーク不要）。
+Playwright 版と同じ date_urls / model_urls / ヘッダー・表になること。
+"""
+import datetime as dt
+
+import pytest
+from bs4 import BeautifulSoup
+
+from config import config
+from scraper import http_backend
+from scraper.http_backend import parse_date_page, parse_hall_page, parse_model_page
+from scraper.scraping_hall_page import build_date_urls
+from scraper.scraping_date_page import build_model_urls
+from scraper.scraping_model_page import build_model_frame, pick_model_name
+
+HALL_URL = "https://min-repo.com/tag/テストホール池袋店"
+DATE_URL = "https://min-repo.com/2001001/"
+MY_JUGGLER = "https://min-repo.com/2001001/?kishu=%E3%83%9E%E3%82%A4%E3%82%B8%E3%83%A3%E3%82%B0%E3%83%A9%E3%83%BCV"
+HAPPY_JUGGLER = "https://min-repo.com/2001001/?kishu=%E3%83%8F%E3%83%83%E3%83%94%E3%83%BC%E3%82%B8%E3%83%A3%E3%82%B0%E3%83%A9%E3%83%BCVIII"
+
+# Playwright 版（scraping_*_page.py）と同じセレクタ
+PW_DATE_LINKS = "#content div table tbody tr td a"
+PW_MODEL_LINKS = "table.kishu tbody tr td a"
+PW_MODEL_TITLE = "div.tab_content > h2"
+PW_MODEL_ROWS = "div > div.table_wrap > table > tbody > tr"
+
+
+@pytest.fixture(autouse=True)
+def csv_dir(tmp_path, monkeypatch):
+    # build_date_urls が CSV を書き出すため、一時ディレクトリに向ける
+    monkeypatch.setattr(config, "CSV_DIR", tmp_path)
+    return tmp_path
+
+
+def soup_of(html: str) -> BeautifulSoup:
+    return BeautifulSoup(html, "html.parser")
+
+
+class FixturePage:
+    """HttpPage の代わりに、url に対応する保存済みの HTML を返す"""
+
+    def __init__(self, pages: dict[str, str]):
+        self.pages = pages
+        self.visited: list[str] = []
+
+    def goto(self, url: str) -> BeautifulSoup:
+        self.visited.append(url)
+        return soup_of(self.pages[url])
+
+
+# =========================
+# parse_*_page
+# =========================
+def test_parse_hall_page(fixture_html):
+    pref, hall, links = parse_hall_page(soup_of(fixture_html("hall_page.html")))
+
+    assert (pref, hall) == ("東京都", "テストホール池袋店")
+    assert links == [
+        ("2026/10/17(土)", "https://min-repo.com/2001001/"),
+        ("10/16(金)", "https://min-repo.com/2000001/"),
+        ("10/15(木)", "https://min-repo.com/1999001/"),
+    ]
+
+
+def test_parse_date_page(fixture_html):
+    links = parse_date_page(soup_of(fixture_html("date_page.html")))
+
+    assert [text for text, _ in links] == ["マイジャグラーV", "バジリスク絆2", "ハッピージャグラーVIII"]
+    assert links[0][1] == MY_JUGGLER
+
+
+def test_parse_model_page(fixture_html):
+    model, header, table = parse_model_page(soup_of(fixture_html("model_page.html")))
+
+    assert model == "ハッピージャグラーVIII"
+    assert header == ["台番", "G数", "差枚", "BB", "RB"]
+    # th だけの見出し行と空行は含めない
+    assert table == [
+        ["101", "7,512", "+1,234", "31", "25"],
+        ["102", "2,048", "-560", "6", "4"],
+        ["平均", "4,780", "+337", "18.5", "14.5"],
+    ]
+
+
+def test_parse_pages_without_content():
+    empty = soup_of("<html><body></body></html>")
+
+    assert parse_hall_page(empty) == ("", "", [])
+    assert parse_date_page(empty) == []
+    assert parse_model_page(empty) == ("", [], [])
+
+
+# =========================
+# extract_*（http 版）
+# =========================
+def test_extract_date_url(fixture_html):
+    page = FixturePage({HALL_URL: fixture_html("hall_page.html")})
+
+    date_urls = http_backend.extract_date_url(HALL_URL, page, period=2)
+
+    # 年のない "M/D" は今年として扱う
+    year = dt.date.today().year
+    assert date_urls == [
+        ("東京都", "テストホール池袋店", "2026-10-17", "https://min-repo.com/2001001/"),
+        ("東京都", "テストホール池袋店", f"{year}-10-16", "https://min-repo.com/2000001/"),
+    ]
+
+
+def test_extract_date_url_without_links_raises():
+    page = FixturePage({HALL_URL: "<div id='content'><h1>テストホール池袋店</h1></div>"})
+
+    with pytest.raises(RuntimeError):
+        http_backend.extract_date_url(HALL_URL, page, period=1)
+
+
+def test_extract_model_url(fixture_html):
+    page = FixturePage({DATE_URL: fixture_html("date_page.html")})
+
+    model_urls = http_backend.extract_model_url(
+        page, "テストホール池袋店", "東京都", DATE_URL, "2026-10-17"
+    )
+
+    assert model_urls == [
+        ("東京都", "テストホール池袋店", "2026-10-17", DATE_URL, MY_JUGGLER),
+        ("東京都", "テストホール池袋店", "2026-10-17", DATE_URL, HAPPY_JUGGLER),
+    ]
+
+
+def test_extract_model_data(fixture_html):
+    page = FixturePage({HAPPY_JUGGLER: fixture_html("model_page.html")})
+    model_url = ("東京都", "テストホール池袋店", "2026-10-17", DATE_URL, HAPPY_JUGGLER)
+
+    df = http_backend.extract_model_data(page, [model_url])
+
+    # 平均行は除く
+    assert df["台番"].tolist() == ["101", "102"]
+    assert df["G数"].tolist() == ["7,512", "2,048"]
+    assert set(df["model"]) == {"ハッピージャグラーVIII"}
+    assert set(df["date"]) == {"2026-10-17"}
+    assert list(df.columns) == ["台番", "G数", "差枚", "BB", "RB", "pref", "hall", "model", "date"]
+
+
+# =========================
+# Playwright 版との一致（ブラウザがない環境ではスキップ）
+# =========================
+@pytest.fixture(scope="module")
+def browser_page():
+    sync_api = pytest.importorskip("playwright.sync_api")
+    try:
+        playwright = sync_api.sync_playwright().start()
+    except Exception as e:
+        pytest.skip(f"Playwright を起動できません: {e}")
+    try:
+        browser = playwright.chromium.launch(headless=True)
+    except Exception as e:
+        playwright.stop()
+        pytest.skip(f"Chromium を起動できません: {e}")
+    page = browser.new_page()
+    yield page
+    browser.close()
+    playwright.stop()
+
+
+def test_hall_page_matches_playwright(fixture_html, browser_page):
+    from scraper.bulk_extract import extract_links
+
+    html = fixture_html("hall_page.html")
+    browser_page.set_content(html)
+    pw_links = extract_links(browser_page, PW_DATE_LINKS)
+    pref, hall, links = parse_hall_page(soup_of(html))
+
+    assert links == pw_links
+    assert build_date_urls(pref, hall, links, 3) == build_date_urls(pref, hall, pw_links, 3)
+
+
+def test_date_page_matches_playwright(fixture_html, browser_page):
+    from scraper.bulk_extract import extract_links
+
+    html = fixture_html("date_page.html")
+    browser_page.set_content(html)
+    pw_links = extract_links(browser_page, PW_MODEL_LINKS)
+    links = parse_date_page(soup_of(html))
+
+    assert links == pw_links
+    args = ("東京都", "テストホール池袋店", "2026-10-17", DATE_URL)
+    assert build_model_urls(*args, links) == build_model_urls(*args, pw_links)
+
+
+def test_model_page_matches_playwright(fixture_html, browser_page):
+    from scraper.bulk_extract import extract_table, extract_texts
+
+    html = fixture_html("model_page.html")
+    browser_page.set_content(html)
+    pw_model = pick_model_name(extract_texts(browser_page, PW_MODEL_TITLE))
+    pw_header, pw_table = extract_table(browser_page, PW_MODEL_ROWS)
+    model, header, table = parse_model_page(soup_of(html))
+
+    assert (model, header, table) == (pw_model, pw_header, pw_table)
+    args = ("東京都", "テストホール池袋店", model, "2026-10-17")
+    assert build_model_frame(header, table, *args).equals(
+        build_model_frame(pw_header, pw_table, *args)
+    )
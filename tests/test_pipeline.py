@@ -0,0 +1,126 @@
+"""UploadPipeline を fake のクライアントで前処理から upsert まで通して確認する"""
+import pandas as pd
+import pytest
+
+from config import config
+from fakes import FakeSupabase
+from scraper import data_to_supabase, master_cache, pipeline, result_hashes
+from scraper.manifest import ScrapeManifest
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """出力先・状態ファイルを tmp_path に向け、fake のクライアントを使わせる"""
+    monkeypatch.setattr(config, "CSV_DIR", tmp_path)
+    monkeypatch.setattr(config, "DEAD_LETTER_DIR", tmp_path / "dead_letter")
+    monkeypatch.setattr(master_cache, "_cache", master_cache.MasterCache(tmp_path / "ids.json"))
+    monkeypatch.setattr(
+        result_hashes, "_store", result_hashes.ResultHashStore(tmp_path / "hashes.csv")
+    )
+    client = FakeSupabase()
+    monkeypatch.setattr(data_to_supabase, "get_supabase_client", lambda: client)
+    return client
+
+
+def hall_frame(hall: str = "テストホール", n: int = 3) -> pd.DataFrame:
+    """スクレイピング直後（fix_columns 後）と同じ列・文字列の1ホール分"""
+    return pd.DataFrame(
+        {
+            "pref": ["東京都"] * n,
+            "hall": [hall] * n,
+            "model": ["マイジャグラーV"] * n,
+            "date": ["2026-10-17"] * n,
+            "台番": [str(101 + i) for i in range(n)],
+            "G数": ["1,234"] * n,
+            "BB": ["5"] * n,
+            "RB": ["4"] * n,
+            "差枚": ["-120"] * n,
+        }
+    )
+
+
+def test_pipeline_uploads_and_exits_cleanly(client, tmp_path):
+    with pipeline.UploadPipeline(maxsize=1) as p:
+        p.put(hall_frame("ホールA"))
+        p.put(hall_frame("ホールB", n=2))
+
+    assert (p.halls, p.rows, p.errors) == (2, 5, [])
+    results = client.tables["results"]
+    assert len(results) == 5
+    assert {r["game"] for r in results} == {1234}
+    assert {r["hall_id"] for r in results} == {1, 2}
+    assert client.rpc_calls == ["refresh_current_units"]
+    assert len(pd.read_csv(tmp_path / "cleaned_all_result_data.csv")) == 5
+
+
+def test_pipeline_reports_failed_halls(client, monkeypatch):
+    def broken(df, supabase):
+        raise ValueError("broken")
+
+    monkeypatch.setattr(data_to_supabase, "add_model", broken)
+
+    with pytest.raises(RuntimeError, match="ホールA"):
+        with pipeline.UploadPipeline() as p:
+            p.put(hall_frame("ホールA"))
+
+
+def test_put_raises_when_uploader_died(client, monkeypatch):
+    monkeypatch.setattr(pipeline, "_PUT_INTERVAL", 0.01)
+
+    def die(self):
+        raise ValueError("boom")
+
+    monkeypatch.setattr(pipeline.UploadPipeline, "_consume", die)
+    p = pipeline.UploadPipeline(maxsize=1)
+    p.__enter__()
+    p._thread.join()
+
+    # キューが一杯になっても待ち続けずに例外になる
+    with pytest.raises(RuntimeError) as info:
+        for _ in range(3):
+            p.put(hall_frame())
+    assert isinstance(info.value.__cause__, ValueError)
+    with pytest.raises(RuntimeError):
+        p.__exit__(None, None, None)
+
+
+def test_manifest_is_marked_only_after_upload(client, tmp_path, monkeypatch):
+    manifest = ScrapeManifest(path=tmp_path / "manifest.csv")
+    ok_pages = [("ホールA", "2026-10-17", "https://min-repo.com/1/?kishu=a")]
+    bad_pages = [("ホールB", "2026-10-17", "https://min-repo.com/2/?kishu=b")]
+    add_model = data_to_supabase.add_model
+
+    def fail_for_b(df, supabase):
+        if "ホールB" in set(df["hall"]):
+            raise ValueError("broken")
+        add_model(df, supabase)
+
+    monkeypatch.setattr(data_to_supabase, "add_model", fail_for_b)
+
+    with pytest.raises(RuntimeError, match="ホールB"):
+        with pipeline.UploadPipeline(manifest=manifest) as p:
+            p.put(hall_frame("ホールA"), ok_pages)
+            p.put(hall_frame("ホールB"), bad_pages)
+
+    assert manifest.is_done(*ok_pages[0])
+    assert not manifest.is_done(*bad_pages[0])
+    # 次回の実行でも、アップロードできなかったホールのページだけを取り直す
+    reloaded = ScrapeManifest(path=tmp_path / "manifest.csv")
+    assert reloaded.is_done(*ok_pages[0])
+    assert not reloaded.is_done(*bad_pages[0])
+
+
+def test_rejected_rows_from_every_hall_are_kept(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(data_to_supabase, "_rejected_started", False)
+    (tmp_path / "rejected_results.csv").write_text("前回の実行分\n")
+
+    with pipeline.UploadPipeline() as p:
+        for hall in ("ホールA", "ホールB"):
+            df = hall_frame(hall)
+            df.loc[0, "BB"] = "-"  # 数値に変換できない行
+            p.put(df)
+
+    rejected = pd.read_csv(tmp_path / "rejected_results.csv")
+    assert rejected["hall"].tolist() == ["ホールA", "ホールB"]
+    assert set(rejected["reason"]) == {"数値変換エラー"}
+    assert len(client.tables["results"]) == 4
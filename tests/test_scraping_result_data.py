@@ -0,0 +1,98 @@
+"""scrape_hall の途中失敗・取り直しの扱いを fake のバックエンドで確認する（ネットワーク不要）"""
+import contextlib
+import types
+
+import pandas as pd
+import pytest
+
+from config import config
+from scraper import scraping_result_data
+from scraper.checkpoint import CheckpointStore
+from scraper.manifest import ScrapeManifest
+
+HALL = config.HallInfo(slug="テストホール", period=3)
+DATES = ["2026-10-15", "2026-10-16", "2026-10-17"]
+
+
+class FakeSession:
+    backend = "http"
+
+    @contextlib.contextmanager
+    def new_page(self):
+        yield None
+
+    @contextlib.contextmanager
+    def timed(self, hall_url):
+        yield types.SimpleNamespace(rows=0)
+
+    def close(self):
+        pass
+
+
+class FakeBackend:
+    """fail_on の日付の機種ページでエラーにする（fail_on が None なら全日付を取得できる）"""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.model_pages: list[str] = []
+
+    def extract_date_url(self, hall_url, page, period):
+        return [("東京都", "テストホール", d, f"https://min-repo.com/{d}/") for d in DATES]
+
+    def extract_model_url(self, page, hall, pref, date_url, date):
+        return [(pref, hall, date, date_url, f"{date_url}?kishu=juggler")]
+
+    def extract_model_data(self, page, model_urls):
+        pref, hall, date, date_url, model_url = model_urls[0]
+        self.model_pages.append(model_url)
+        if date == self.fail_on:
+            raise RuntimeError("page error")
+        return pd.DataFrame({"台番": ["101"], "pref": [pref], "hall": [hall], "date": [date]})
+
+
+@pytest.fixture
+def backends(tmp_path, monkeypatch):
+    """session.backend ごとの fake（http は最後の日付で失敗、playwright は成功）"""
+    monkeypatch.setattr(config, "CSV_DIR", tmp_path)
+    table = {"http": FakeBackend(fail_on=DATES[-1]), "playwright": FakeBackend()}
+    monkeypatch.setattr(scraping_result_data, "get_backend", lambda name: table[name])
+    return table
+
+
+def test_failed_hall_returns_finished_dates_without_marking_manifest(backends, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SCRAPER_FALLBACK", False)
+    manifest = ScrapeManifest(path=tmp_path / "manifest.csv")
+
+    scraped = scraping_result_data.scrape_hall(FakeSession(), HALL, manifest=manifest)
+
+    assert scraped.df["date"].tolist() == DATES[:2]
+    assert [p[1] for p in scraped.pages] == DATES[:2]
+    # manifest への記録はアップロード後（UploadPipeline）に行う
+    assert not any(manifest.is_done(*p) for p in scraped.pages)
+
+
+def test_fallback_skips_pages_already_taken(backends, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SCRAPER_FALLBACK", True)
+    fallback = types.SimpleNamespace(get=lambda: types.SimpleNamespace(
+        backend="playwright", new_page=FakeSession().new_page
+    ))
+    manifest = ScrapeManifest(path=tmp_path / "manifest.csv")
+
+    scraped = scraping_result_data.scrape_hall(
+        FakeSession(), HALL, manifest=manifest, fallback=fallback
+    )
+
+    assert sorted(scraped.df["date"]) == DATES
+    assert [p[1] for p in scraped.pages] == DATES
+    # Playwright では http で取れなかった日付だけを取得する
+    assert backends["playwright"].model_pages == [f"https://min-repo.com/{DATES[-1]}/?kishu=juggler"]
+
+
+def test_failed_hall_returns_checkpointed_dates(backends, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SCRAPER_FALLBACK", False)
+    checkpoint = CheckpointStore(tmp_path / "checkpoints")
+
+    scraped = scraping_result_data.scrape_hall(FakeSession(), HALL, checkpoint=checkpoint)
+
+    assert scraped.df["date"].tolist() == DATES[:2]
+    assert not checkpoint.is_hall_done(scraping_result_data.hall_url_of(HALL))
@@ -0,0 +1,119 @@
+"""scraper.upload_engine の再送・バックオフ・デッドレターを fake のクライアントで確認する"""
+import json
+import time
+import types
+
+import pytest
+
+from config import config
+from fakes import FakeSupabase
+from scraper import upload_engine
+
+ON_CONFLICT = "hall_id,model_id,unit_no,date"
+
+
+def records(n: int) -> list[dict]:
+    return [
+        {"hall_id": 1, "model_id": 1, "unit_no": 100 + i, "date": "2026-10-01", "game": i}
+        for i in range(n)
+    ]
+
+
+def read_lines(path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.fixture(autouse=True)
+def dead_letter_dir(tmp_path, monkeypatch):
+    path = tmp_path / "dead_letter"
+    monkeypatch.setattr(config, "DEAD_LETTER_DIR", path)
+    return path
+
+
+# =========================
+# upsert_batches
+# =========================
+def test_retries_until_sent():
+    client = FakeSupabase(fail_times={"results": 2})
+
+    result = upload_engine.upsert_batches(
+        client, "results", records(4), ON_CONFLICT, batch_size=2, workers=1, max_retries=3, backoff=0
+    )
+
+    assert (result.sent, result.failed, result.batches, result.retries) == (4, 0, 2, 2)
+    assert result.dead_letter is None
+    assert client.upsert_calls["results"] == 4
+    assert len(client.tables["results"]) == 4
+
+
+def test_backoff_doubles_each_retry(monkeypatch):
+    waits = []
+    monkeypatch.setattr(
+        upload_engine, "time", types.SimpleNamespace(sleep=waits.append, perf_counter=time.perf_counter)
+    )
+    monkeypatch.setattr(upload_engine.random, "uniform", lambda a, b: 0.0)
+    client = FakeSupabase(fail_times={"results": 3})
+
+    upload_engine.upsert_batches(
+        client, "results", records(1), ON_CONFLICT, workers=1, max_retries=3, backoff=0.5
+    )
+
+    assert waits == [0.5, 1.0, 2.0]
+
+
+def test_failed_batch_goes_to_dead_letter(dead_letter_dir):
+    # 最初のバッチだけ再送しても失敗し、2つ目のバッチは送れる
+    client = FakeSupabase(fail_times={"results": 3})
+    rows = records(4)
+
+    result = upload_engine.upsert_batches(
+        client, "results", rows, ON_CONFLICT, batch_size=2, workers=1, max_retries=2, backoff=0
+    )
+
+    assert (result.sent, result.failed, result.retries) == (2, 2, 2)
+    assert result.dead_letter.parent == dead_letter_dir
+    assert read_lines(result.dead_letter) == [
+        {"table": "results", "on_conflict": ON_CONFLICT, "rows": rows[:2]}
+    ]
+
+
+def test_no_dead_letter_when_disabled(dead_letter_dir):
+    client = FakeSupabase(fail_times={"results": 1})
+
+    result = upload_engine.upsert_batches(
+        client, "results", records(2), ON_CONFLICT, max_retries=0, backoff=0, dead_letter=False
+    )
+
+    assert result.failed == 2
+    assert result.dead_letter is None
+    assert not dead_letter_dir.exists()
+
+
+# =========================
+# retry_dead_letters
+# =========================
+def test_retry_dead_letters_keeps_only_failed_batches():
+    rows = records(4)
+    path = upload_engine.write_dead_letter("results", ON_CONFLICT, [rows[:2], rows[2:]])
+
+    # 1つ目のバッチはまた失敗し、2つ目は送れる
+    client = FakeSupabase(fail_times={"results": 1})
+    upload_engine.retry_dead_letters(client, workers=1, max_retries=0, backoff=0)
+
+    assert read_lines(path) == [{"table": "results", "on_conflict": ON_CONFLICT, "rows": rows[:2]}]
+    assert client.tables["results"] == rows[2:]
+
+    # 残ったバッチも送れたらファイルは消える
+    upload_engine.retry_dead_letters(client, workers=1, max_retries=0, backoff=0)
+
+    assert not path.exists()
+    assert len(client.tables["results"]) == 4
+
+
+def test_retry_dead_letters_without_directory(dead_letter_dir):
+    client = FakeSupabase()
+
+    upload_engine.retry_dead_letters(client)
+
+    assert client.upsert_calls == {}
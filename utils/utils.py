@@ -1,5 +1,6 @@
 import os
 import re
+import datetime as dt
 import unicodedata
 
 # =========================
@@ -30,3 +31,20 @@ def extract_model_name(text: str) -> str:
 
     return name
 
+
+
+def parse_date_text(text: str, today: dt.date | None = None) -> str | None:
+    """
+    "YYYY/MM/DD" または "M/D" 形式の日付リンク文字列を 'YYYY-MM-DD' に変換する
+    年がない場合は today の年を補う。解釈できない場合は None
+    """
+    m = re.match(r"(?:(\d{4})/)?(\d{1,2})/(\d{1,2})", text)
+    if not m:
+        return None
+    y, mth, d = m.groups()
+    if y is None:
+        y = str((today or dt.date.today()).year)
+    try:
+        return dt.date(int(y), int(mth), int(d)).strftime("%Y-%m-%d")
+    except ValueError:
+        return None